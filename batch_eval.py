@@ -0,0 +1,23 @@
+import numpy as np
+
+_DISTANCE_VECTORS = {}
+
+
+def get_distance_vector(distances):
+    # distances: goal distance of every cell for one side, a BoardState.distances entry
+    vector = _DISTANCE_VECTORS.get(distances)
+    if vector is None:
+        vector = np.array(distances, dtype=np.float64)
+        _DISTANCE_VECTORS[distances] = vector
+    return vector
+
+
+def get_cell_matrix(states):
+    # (n_states, n_cells) matrix of the piece codes of states on the same board
+    return np.frombuffer(b"".join([state.cells for state in states]), dtype=np.uint8).reshape(len(states), -1)
+
+
+def get_progress(cells, code, distances):
+    # Goal-distance sum and piece count of side `code` in every row of `cells`
+    occupancy = cells == code
+    return occupancy @ get_distance_vector(distances), occupancy.sum(axis=1)
@@ -0,0 +1,317 @@
+# Micro and macro benchmarks for move generation and the search players.
+#
+#   python -m benchmarks.suite                      run, write benchmarks/results.json, compare to the baseline
+#   python -m benchmarks.suite --save-baseline      run and store the results as benchmarks/baseline.json
+#   python -m benchmarks.suite --quick              smoke run, shown against benchmarks/baseline_quick.json
+#   python -m benchmarks.suite --record-positions   re-record the fixed positions in benchmarks/positions.json
+#
+# Every metric is a time (lower is better) except the *sims_per_sec entries and
+# the *depth entries, the tree depth reached at a fixed simulation budget with
+# and without progressive widening. Time baselines are scaled by the ratio of
+# a fixed pure-Python calibration loop, so a slower or faster machine doesn't
+# read as a change; depths are compared as they are. A macro or depth metric
+# more than --threshold worse than the scaled baseline is a regression and
+# makes the run exit with status 1. The micro timings, and every timing of a
+# --quick run, move by more than that from run to run on the same tree, so they
+# are shown but don't fail the run.
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+import board
+from board_state import BoardState
+from evaluation import LinearEvaluator
+from movegen import get_legal_moves
+from parallel import VECTOR_BATCH
+from players.grave_player import GRAVEPlayer
+from players.mcts_player import MCTSPlayer
+from players.rave_player import RAVEPlayer
+from search_stats import SearchStats
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+POSITIONS_PATH = os.path.join(BENCH_DIR, "positions.json")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+QUICK_BASELINE_PATH = os.path.join(BENCH_DIR, "baseline_quick.json")  # --quick timings differ from full ones
+RESULTS_PATH = os.path.join(BENCH_DIR, "results.json")
+
+BOARD_SIZES = (6, 8)
+NAMES = ("P1", "P2")
+WIN_THRESHOLD = 6
+# plies of a seeded random game after which each position is recorded
+POSITION_PLIES = {"opening": 0, "middle": 30, "late": 80}
+PLAYERS = {"MCTS": MCTSPlayer, "RAVE": RAVEPlayer, "GRAVE": GRAVEPlayer}
+MACRO_SIMULATIONS = 300
+MACRO_ROUNDS = {False: 20, True: 3}  # by --quick
+WIDENING = 1  # widening factor of the *widened_depth searches
+
+
+def new_state(board_size):
+    saved = board.BOARD_SIZE
+    board.BOARD_SIZE = board_size
+    try:
+        grid, corner_cors1, corner_cors2 = board.init_gird(*NAMES)
+    finally:
+        board.BOARD_SIZE = saved
+    state = BoardState.from_grid(grid, NAMES, (corner_cors2, corner_cors1))
+    return state, (corner_cors2, corner_cors1)
+
+
+def record_positions():
+    positions = {}
+    for board_size in BOARD_SIZES:
+        rng = random.Random(board_size)
+        state, _ = new_state(board_size)
+        positions[str(board_size)] = {}
+        ply = 0
+        for name, plies in sorted(POSITION_PLIES.items(), key=lambda item: item[1]):
+            while ply < plies:
+                moves = get_legal_moves(state, 2 - ply % 2)
+                if moves:
+                    state.apply(rng.choice(moves))
+                ply += 1
+            positions[str(board_size)][name] = "".join(str(code) for code in state.cells)
+    with open(POSITIONS_PATH, "w") as f:
+        json.dump(positions, f, indent=2)
+    print(f"Recorded {POSITIONS_PATH}")
+
+
+def load_positions():
+    with open(POSITIONS_PATH) as f:
+        recorded = json.load(f)
+    positions = {}
+    for board_size in BOARD_SIZES:
+        start, corners = new_state(board_size)
+        for name, cells in recorded[str(board_size)].items():
+            state = BoardState(start.table, NAMES, bytearray(int(code) for code in cells), start.goals)
+            positions[(board_size, name)] = (state, corners)
+    return positions
+
+
+def time_call(fn, min_time=0.05, repeat=7):
+    # Best per-call time in microseconds over `repeat` runs of about min_time seconds each
+    with no_gc():
+        return best_call_time(fn, min_time, repeat)
+
+
+@contextlib.contextmanager
+def no_gc():
+    # Timed code runs with the cyclic garbage collector off, as in timeit, after
+    # collecting the garbage of the earlier runs, so no collection lands in it
+    gc.collect()
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.enable()
+
+
+def best_call_time(fn, min_time, repeat):
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / 10:
+            break
+        number *= 10
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best * 1e6
+
+
+def calibrate(calibrations):
+    # One calibration run, appended to calibrations. Runs are spread through the
+    # micro and macro benchmarks and the report keeps the best, so a slow spell of
+    # the machine at any single point doesn't scale every baseline.
+    calibrations.append(time_call(calibration_workload))
+
+
+def calibration_workload():
+    total = 0
+    for i in range(10000):
+        total += i * i % 7
+    return total
+
+
+def searched_player(player_cls, state, corners, simulations, **options):
+    random.seed(0)
+    if player_cls is RAVEPlayer:
+        player = player_cls(NAMES[0], corners[0], WIN_THRESHOLD, simulations=simulations, **options)
+    else:
+        player = player_cls(NAMES[0], corners[0], simulations=simulations, **options)
+    root = player.search(state)
+    return player, root
+
+
+def deepest_path(root):
+    path = [root]
+    while path[-1].children:
+        path.append(max(path[-1].children, key=lambda child: child.visits))
+    return path
+
+
+def micro(positions, min_time, calibrations):
+    results = {}
+    for (board_size, name), (state, corners) in positions.items():
+        calibrate(calibrations)
+        prefix = f"micro/{board_size}/{name}"
+        results[f"{prefix}/movegen_us"] = time_call(lambda: get_legal_moves(state, 1), min_time)
+        results[f"{prefix}/state_copy_us"] = time_call(state.copy, min_time)
+        linear = LinearEvaluator()
+        results[f"{prefix}/linear_score_us"] = time_call(lambda: linear.score(state, 1), min_time)
+
+        for player_name in ("MCTS", "GRAVE"):
+            player, root = searched_player(PLAYERS[player_name], state, corners, MACRO_SIMULATIONS)
+            if not root.children:
+                continue
+            results[f"{prefix}/{player_name}/default_policy_us"] = time_call(
+                lambda: player.default_policy(state), min_time)
+            leaves = [state] * VECTOR_BATCH
+            results[f"{prefix}/{player_name}/default_policy_batch_us"] = time_call(
+                lambda: player.default_policy_batch(leaves), min_time) / len(leaves)  # per leaf
+            results[f"{prefix}/{player_name}/best_child_us"] = time_call(
+                lambda: root.best_child(player.c), min_time)
+            path = deepest_path(root)
+            if player_name == "MCTS":
+                results[f"{prefix}/{player_name}/backup_us"] = time_call(
+                    lambda: player.backup(path[-1], 0.5), min_time)
+            else:
+                played = ({node.move for node in path[1:]}, set())  # as GRAVE's tree_policy, by side
+                results[f"{prefix}/{player_name}/backup_us"] = time_call(
+                    lambda: player.backup((path, played), 0.5), min_time)
+    return results
+
+
+def macro(positions, rounds, calibrations):
+    # Every search is timed once per round, so the samples of each one are spread
+    # over the whole section instead of falling in one slow spell of the machine
+    seconds = {}  # (board_size, player_name, position name) -> seconds of each round
+    for _ in range(rounds):
+        calibrate(calibrations)
+        for board_size in BOARD_SIZES:
+            for player_name, player_cls in PLAYERS.items():
+                for name in ("opening", "middle"):
+                    state, corners = positions[(board_size, name)]
+                    with no_gc():
+                        start = time.perf_counter()
+                        with contextlib.redirect_stdout(io.StringIO()):
+                            searched_player(player_cls, state, corners, MACRO_SIMULATIONS)
+                        elapsed = time.perf_counter() - start
+                    seconds.setdefault((board_size, player_name, name), []).append(elapsed)
+
+    results = {}
+    for board_size in BOARD_SIZES:
+        for player_name in PLAYERS:
+            runs = [seconds[(board_size, player_name, name)] for name in ("opening", "middle")]
+            prefix = f"macro/{board_size}/{player_name}"
+            # Median per position, so a few slow rounds don't move it
+            results[f"{prefix}/time_per_move_ms"] = sum(statistics.median(run) for run in runs) / len(runs) * 1000
+            results[f"{prefix}/sims_per_sec"] = MACRO_SIMULATIONS / min(min(run) for run in runs)
+    return results
+
+
+def depth(positions):
+    results = {}
+    for (board_size, name), (state, corners) in positions.items():
+        for player_name, player_cls in PLAYERS.items():
+            prefix = f"depth/{board_size}/{name}/{player_name}"
+            for metric, options in (("depth", {}), ("widened_depth", {"widening": WIDENING})):
+                _, root = searched_player(player_cls, state, corners, MACRO_SIMULATIONS, **options)
+                stats = SearchStats()
+                stats.measure_tree(root)
+                results[f"{prefix}/{metric}"] = stats.max_depth
+    return results
+
+
+GATED = ("macro/", "depth/")  # metrics that fail the run, see the top comment
+
+
+def compare(report, baseline_report, threshold):
+    results, baseline = report["results"], baseline_report["results"]
+    speed = report["calibration_us"] / baseline_report["calibration_us"]
+    print(f"calibration x{speed:.2f} against the baseline machine")
+    regressions = []
+    for key, value in sorted(results.items()):
+        base = baseline.get(key)
+        if base is None or base == 0:
+            continue
+        if key.endswith("sims_per_sec"):
+            base = base / speed
+        elif not key.endswith("depth"):
+            base = base * speed
+        # ratio > 1 means worse
+        ratio = base / value if key.endswith(("sims_per_sec", "depth")) else value / base
+        flag = ""
+        if ratio > 1 + threshold:
+            if key.startswith(GATED):
+                flag = "  REGRESSION"
+                regressions.append(key)
+            else:
+                flag = "  slower"
+        print(f"{key:50s} {value:12.2f}  baseline {base:12.2f}  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro and macro benchmarks of move generation and search.")
+    parser.add_argument("--out", default=RESULTS_PATH)
+    parser.add_argument("--baseline", help="default: benchmarks/baseline.json, baseline_quick.json with --quick")
+    parser.add_argument("--threshold", type=float, default=0.5, help="allowed slowdown against the baseline")
+    parser.add_argument("--quick", action="store_true", help="shorter timings, for a smoke run that never fails")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--record-positions", action="store_true")
+    args = parser.parse_args()
+
+    if args.record_positions:
+        record_positions()
+        return
+
+    baseline_path = args.baseline or (QUICK_BASELINE_PATH if args.quick else BASELINE_PATH)
+    positions = load_positions()
+    results = {}
+    calibrations = []
+    results.update(micro(positions, 0.005 if args.quick else 0.05, calibrations))
+    results.update(macro(positions, MACRO_ROUNDS[args.quick], calibrations))
+    results.update(depth(positions))
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "quick": args.quick,
+        "calibration_us": min(calibrations),
+        "results": results,
+    }
+    out = baseline_path if args.save_baseline else args.out
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"Wrote {out}")
+    if args.save_baseline or not os.path.exists(baseline_path):
+        return
+
+    with open(baseline_path) as f:
+        baseline_report = json.load(f)
+    if baseline_report.get("quick", False) != args.quick:
+        raise SystemExit(f"{baseline_path} was recorded with another --quick setting; pass a matching --baseline")
+    regressions = compare(report, baseline_report, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}")
+        if not args.quick:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+# Transposition table hit rates of MCTS and GRAVE search over the opening moves.
+# Run from the repo root: python -m benchmarks.transpositions
+import contextlib
+import io
+import random
+import time
+
+from board import init_gird
+from board_state import BoardState
+from transposition import TranspositionTable
+from players.grave_player import GRAVEPlayer
+from players.mcts_player import MCTSPlayer
+
+N_MOVES = 10
+
+
+def run(player_cls, simulations):
+    random.seed(0)
+    grid, corner_cors1, corner_cors2 = init_gird("P1", "P2")
+    state = BoardState.from_grid(grid, ("P1", "P2"), (corner_cors2, corner_cors1))
+    table = TranspositionTable()
+    player = player_cls("P1", corner_cors2, simulations=simulations, transpositions=table)
+    opponent = MCTSPlayer("P2", corner_cors1, simulations=100)
+
+    lookups, hits, seconds = 0, 0, 0
+    for i in range(N_MOVES):
+        for p in (player, opponent):
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                piece, cor = p.move(state)
+            if p is player:
+                seconds += time.perf_counter() - start
+            state.apply((state.table.index[piece], state.table.index[cor]))
+    return table.lookups, table.hits, seconds
+
+
+def main():
+    for simulations in (300, 5000):
+        for player_cls in (MCTSPlayer, GRAVEPlayer):
+            lookups, hits, seconds = run(player_cls, simulations)
+            print(f"{player_cls.__name__:12s} simulations={simulations:<5d} lookups={lookups:<7d} "
+                  f"hits={hits:<7d} hit_rate={hits / max(lookups, 1):.3f} time/move={seconds / N_MOVES:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
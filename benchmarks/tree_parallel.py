@@ -0,0 +1,49 @@
+# Simulations/sec of tree-parallel GRAVE and MCTS search as tree_workers grows.
+# Run from the repo root: python -m benchmarks.tree_parallel [max_workers]
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+from board import init_gird
+from board_state import BoardState
+from rollout import Rollout
+from players.grave_player import GRAVEPlayer
+from players.mcts_player import MCTSPlayer
+
+SIMULATIONS = 400
+
+
+def run(player_cls, tree_workers, state, corner_cors):
+    player = player_cls("P1", corner_cors, simulations=SIMULATIONS, tree_workers=tree_workers,
+                        rollout=Rollout("greedy", depth=40, n_rollouts=4))
+    # first move warms up the worker pool
+    with contextlib.redirect_stdout(io.StringIO()):
+        player.move(state)
+        start = time.perf_counter()
+        player.move(state)
+    return SIMULATIONS / (time.perf_counter() - start)
+
+
+def main():
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+    random.seed(0)
+    grid, corner_cors1, corner_cors2 = init_gird("P1", "P2")
+    state = BoardState.from_grid(grid, ("P1", "P2"), (corner_cors2, corner_cors1))
+
+    workers = [1]
+    while workers[-1] * 2 <= max_workers:
+        workers.append(workers[-1] * 2)
+
+    for player_cls in (MCTSPlayer, GRAVEPlayer):
+        base = None
+        for tree_workers in workers:
+            rate = run(player_cls, tree_workers, state, corner_cors2)
+            base = base or rate
+            print(f"{player_cls.__name__:12s} tree_workers={tree_workers:<3d} {rate:8.1f} sims/s  x{rate / base:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,3 @@
-import pygame
 import math
 
 # colors
@@ -57,6 +56,9 @@ def init_gird(name1, name2):
 
 
 def draw_board(screen, gird, selected_piece=None):
+    # pygame is only needed for drawing, so headless matches never import it
+    import pygame
+
     screen.fill(WHITE)
     font = pygame.font.SysFont(None, 16)
     for (r, q), cell in gird.items():
@@ -82,36 +84,3 @@ def get_cor_at_pos(pos, grid):
         if distance <= CELL_RADIUS:
             cor = (r, q)
     return cor
-
-
-def get_cors_by_distance(cors, distance):
-    return [
-        (cors[0], cors[1] - distance),
-        (cors[0], cors[1] + distance),
-        (cors[0] - distance, cors[1]),
-        (cors[0] + distance, cors[1]),
-        (cors[0] + distance, cors[1] - distance),
-        (cors[0] - distance, cors[1] + distance),
-    ]
-
-
-def get_possible_cors(selected_piece, gird):
-    cors = get_cors_by_distance(selected_piece, 2)
-    # within the border and no other pieces
-    cors = [
-        cor if cor in gird.keys() and gird[cor]['piece'] is None else None
-        for cor in cors
-    ]
-    # print("cors within border:", cors)
-
-    # follow the rule
-    neighbor_cors = get_cors_by_distance(selected_piece, 1)
-    indices = [
-        i for i, neighbor_cor in enumerate(neighbor_cors)
-        if neighbor_cor in gird.keys() and gird[neighbor_cor]['piece'] is not None
-    ]
-    cors = [cors[i] for i in indices]
-    cors = [cor for cor in cors if cor is not None]
-    # print("Possible cors: ", cors)
-    return cors
-
@@ -0,0 +1,167 @@
+import random
+
+EMPTY = 0
+
+_CELL_TABLES = {}
+
+
+def hex_distance(a, b):
+    aq, ar = a
+    bq, br = b
+    return (abs(aq - bq) + abs(ar - br) + abs((aq + ar) - (bq + br))) // 2
+
+
+class CellTable:
+    def __init__(self, cors):
+        self.cors = list(cors)  # index -> (r, q)
+        self.index = {cor: i for i, cor in enumerate(self.cors)}  # (r, q) -> index
+        self.n_cells = len(self.cors)
+        self._goal_cells = {}
+        self._goal_distances = {}
+
+        # Zobrist keys, zobrist[k][i]: piece of names[k] on cell i. Fixed seed so
+        # position hashes are the same in every process.
+        rng = random.Random(0)
+        self.zobrist = [[rng.getrandbits(64) for _ in self.cors] for _ in range(2)]
+        self.side_keys = [0] + [rng.getrandbits(64) for _ in range(2)]  # side to move, by code
+
+    def __reduce__(self):
+        # Pickle as the cell list only; the receiving process reuses or rebuilds its own table
+        return get_cell_table, (tuple(self.cors),)
+
+    def goal_cells(self, corner_cors):
+        key = tuple(corner_cors)
+        cells = self._goal_cells.get(key)
+        if cells is None:
+            cells = frozenset(self.index[cor] for cor in corner_cors)
+            self._goal_cells[key] = cells
+        return cells
+
+    def goal_distances(self, goal_cells):
+        # distances[i]: hex distance from cell i to the closest goal cell
+        distances = self._goal_distances.get(goal_cells)
+        if distances is None:
+            goal_cors = [self.cors[i] for i in goal_cells]
+            distances = tuple(min(hex_distance(cor, goal) for goal in goal_cors) for cor in self.cors)
+            self._goal_distances[goal_cells] = distances
+        return distances
+
+
+def get_cell_table(cors):
+    # One table per board layout, shared by every state built from it
+    key = tuple(cors)
+    table = _CELL_TABLES.get(key)
+    if table is None:
+        table = CellTable(key)
+        _CELL_TABLES[key] = table
+    return table
+
+
+class BoardState:
+    __slots__ = ('table', 'names', 'cells', 'goals', 'distances', 'pieces', 'slots', 'n_in_goal', 'dist_sum',
+                 'hash', 'occupied')
+
+    def __init__(self, table, names, cells, goals):
+        self.table = table
+        self.names = names  # piece code k+1 -> names[k]
+        self.cells = cells  # bytearray, one piece code per cell
+        self.goals = goals  # goals[k]: frozenset of goal cells of names[k]
+        self.distances = tuple(table.goal_distances(goal) for goal in goals)
+
+        # pieces[k]: cells of names[k]; slots[cell]: position of that cell in its owner's list
+        self.pieces = [[] for _ in names]
+        self.slots = bytearray(table.n_cells)
+        for i, code in enumerate(cells):
+            if code != EMPTY:
+                self.slots[i] = len(self.pieces[code - 1])
+                self.pieces[code - 1].append(i)
+        self.n_in_goal = [sum(1 for i in pieces if i in goal) for pieces, goal in zip(self.pieces, goals)]
+        self.dist_sum = [sum(distances[i] for i in pieces) for pieces, distances in zip(self.pieces, self.distances)]
+        self.hash = 0
+        for k, pieces in enumerate(self.pieces):
+            for i in pieces:
+                self.hash ^= table.zobrist[k][i]
+        self.occupied = sum(1 << i for i, code in enumerate(cells) if code != EMPTY)  # bitmask of non-empty cells
+
+    @classmethod
+    def from_grid(cls, grid, names, corners):
+        # corners[k]: goal corner (r, q) list of names[k]
+        table = get_cell_table(grid.keys())
+        names = tuple(names)
+        codes = {name: k + 1 for k, name in enumerate(names)}
+        cells = bytearray(codes.get(grid[cor]['piece'], EMPTY) for cor in table.cors)
+        goals = tuple(table.goal_cells(corner_cors) for corner_cors in corners)
+        return cls(table, names, cells, goals)
+
+    def __reduce__(self):
+        # Compact pickled form (cells as bytes) for sending a root state to search workers
+        return BoardState, (self.table, self.names, bytearray(self.cells), self.goals)
+
+    def copy(self):
+        new = BoardState.__new__(BoardState)
+        new.table = self.table
+        new.names = self.names
+        new.cells = self.cells[:]
+        new.goals = self.goals
+        new.distances = self.distances
+        new.pieces = [pieces[:] for pieces in self.pieces]
+        new.slots = self.slots[:]
+        new.n_in_goal = self.n_in_goal[:]
+        new.dist_sum = self.dist_sum[:]
+        new.hash = self.hash
+        new.occupied = self.occupied
+        return new
+
+    def code(self, name):
+        return self.names.index(name) + 1
+
+    def opponent(self, code):
+        # two-player board: codes 1 and 2
+        return 3 - code
+
+    def piece_at(self, cor):
+        code = self.cells[self.table.index[cor]]
+        return self.names[code - 1] if code != EMPTY else None
+
+    def get_pieces(self, code):
+        return self.pieces[code - 1]
+
+    def get_n_pieces_goal(self, code):
+        return self.n_in_goal[code - 1]
+
+    def get_goal_distance(self, code):
+        # Sum over the side's pieces of the distance to the closest goal cell
+        return self.dist_sum[code - 1]
+
+    def all_in_goal(self, code):
+        return self.n_in_goal[code - 1] == len(self.pieces[code - 1])
+
+    def apply(self, move):
+        from_i, to_i = move
+        cells = self.cells
+        k = cells[from_i] - 1
+        cells[to_i] = cells[from_i]
+        cells[from_i] = EMPTY
+
+        slot = self.slots[from_i]
+        self.pieces[k][slot] = to_i
+        self.slots[to_i] = slot
+        goal = self.goals[k]
+        self.n_in_goal[k] += (to_i in goal) - (from_i in goal)
+        distances = self.distances[k]
+        self.dist_sum[k] += distances[to_i] - distances[from_i]
+        keys = self.table.zobrist[k]
+        self.hash ^= keys[from_i] ^ keys[to_i]
+        self.occupied ^= (1 << from_i) | (1 << to_i)
+
+    def hash_after(self, move):
+        from_i, to_i = move
+        keys = self.table.zobrist[self.cells[from_i] - 1]
+        return self.hash ^ keys[from_i] ^ keys[to_i]
+
+    def undo(self, move):
+        self.apply((move[1], move[0]))
+
+    def to_cors(self, move):
+        from_i, to_i = move
+        return self.table.cors[from_i], self.table.cors[to_i]
@@ -0,0 +1,141 @@
+import numpy as np
+
+from batch_eval import get_cell_matrix, get_progress
+from movegen import get_legal_moves
+
+EVALUATORS = ("mcts", "grave", "linear")
+
+# Position scores kept per evaluator; the cache is cleared when it reaches cache_size entries
+DEFAULT_CACHE_SIZE = 100000
+
+# DistanceEvaluator offsets of the players' built-in heuristics
+DISTANCE_NAMES = {1e-6: "mcts", 1: "grave"}
+
+FEATURES = ("distance", "behind", "spread", "jump", "in_goal")
+DEFAULT_WEIGHTS = {"bias": 1.0, "distance": -0.5, "behind": -0.2, "spread": -0.1, "jump": 0.2, "in_goal": 0.3}
+
+
+class Evaluator:
+    # progress(state, code): how far side `code` has got, larger is better. Scores
+    # are memoized by (position hash, code), so leaves reached again in a search
+    # (or at the end of another playout) aren't scored twice. cache_size=0 turns
+    # the cache off.
+    name = None  # opening book kind suffix unless it is the player's role, see opening_book.book_kind
+
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE):
+        self.cache_size = cache_size
+        self.cache = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        # Sent to pool workers with the player: each process fills its own cache
+        state = self.__dict__.copy()
+        state['cache'] = {}
+        return state
+
+    def progress(self, state, code):
+        if not self.cache_size:
+            return self.score(state, code)
+        key = (state.hash, code)
+        value = self.cache.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = self.score(state, code)
+        if len(self.cache) >= self.cache_size:
+            self.cache.clear()
+        self.cache[key] = value
+        return value
+
+    def progress_batch(self, states, code):
+        # progress of many states at once, as a NumPy array
+        return np.array([self.progress(state, code) for state in states])
+
+    def score(self, state, code):
+        raise NotImplementedError
+
+
+class DistanceEvaluator(Evaluator):
+    # The players' heuristic: 1 / (offset + average goal distance of the pieces).
+    # MCTS uses offset=1e-6, GRAVE and RAVE offset=1, and the evaluator is named
+    # after them; any other offset gives a name like "distance0.5". The score is
+    # O(1) from the state's incremental distance sum, cheaper than a cache
+    # lookup, so the cache is off by default.
+    def __init__(self, offset=1, cache_size=0):
+        super().__init__(cache_size)
+        self.offset = offset
+        self.name = DISTANCE_NAMES.get(offset, f"distance{offset:g}")
+
+    def score(self, state, code):
+        # Minimize the average distance between chess pieces and the target angle
+        n_pieces = len(state.get_pieces(code))
+        if not n_pieces:
+            return 0
+        return 1 / (self.offset + state.get_goal_distance(code) / n_pieces)
+
+    def progress_batch(self, states, code):
+        dist_sum, n_pieces = get_progress(get_cell_matrix(states), code, states[0].distances[code - 1])
+        safe_n_pieces = np.maximum(n_pieces, 1)
+        return np.where(n_pieces > 0, 1 / (self.offset + dist_sum / safe_n_pieces), 0)
+
+
+class LinearEvaluator(Evaluator):
+    # bias + sum of weights[f] * feature f, with every feature scaled by the
+    # board's largest goal distance:
+    #   distance  average goal distance of the pieces
+    #   behind    goal distance of the last piece, the one left behind
+    #   spread    goal distance between the first and the last piece
+    #   jump      largest goal distance gained by one legal move
+    #   in_goal   fraction of the pieces already in the goal
+    # weights: any subset of DEFAULT_WEIGHTS' keys, e.g. fitted offline.
+    name = "linear"
+
+    def __init__(self, weights=None, cache_size=DEFAULT_CACHE_SIZE):
+        super().__init__(cache_size)
+        self.weights = dict(DEFAULT_WEIGHTS)
+        if weights is not None:
+            unknown = set(weights) - set(DEFAULT_WEIGHTS)
+            if unknown:
+                raise ValueError(f"Unknown evaluator features: {', '.join(sorted(unknown))}")
+            self.weights.update(weights)
+        self.max_distances = {}
+
+    def features(self, state, code):
+        distances = state.distances[code - 1]
+        max_distance = self.max_distances.get(distances)
+        if max_distance is None:
+            max_distance = max(max(distances), 1)
+            self.max_distances[distances] = max_distance
+        pieces = state.get_pieces(code)
+        piece_distances = [distances[i] for i in pieces]
+        last, first = max(piece_distances), min(piece_distances)
+        jump = max([distances[from_i] - distances[to_i] for from_i, to_i in get_legal_moves(state, code)],
+                   default=0)
+        return {
+            "distance": state.get_goal_distance(code) / len(pieces) / max_distance,
+            "behind": last / max_distance,
+            "spread": (last - first) / max_distance,
+            "jump": max(jump, 0) / max_distance,
+            "in_goal": state.get_n_pieces_goal(code) / len(pieces),
+        }
+
+    def score(self, state, code):
+        if not state.get_pieces(code):
+            return 0
+        weights = self.weights
+        features = self.features(state, code)
+        return weights["bias"] + sum(weights[name] * features[name] for name in FEATURES)
+
+
+def make_evaluator(name):
+    # "mcts" / "grave": the players' built-in heuristics, "linear": LinearEvaluator
+    # with the default weights
+    if name == "mcts":
+        return DistanceEvaluator(offset=1e-6)
+    if name == "grave":
+        return DistanceEvaluator(offset=1)
+    if name == "linear":
+        return LinearEvaluator()
+    raise ValueError(f"Unknown evaluator: {name} (expected one of {', '.join(EVALUATORS)})")
@@ -4,7 +4,9 @@ import sys
 import math
 
 from board import WINDOW_WIDTH, WINDOW_HEIGHT, init_gird, draw_board, get_cor_at_pos
+from board_state import BoardState
 from human_player import HumanPlayer
+from opening_book import OpeningBook
 from players.grave_player import GRAVEPlayer
 from players.mcts_player import MCTSPlayer
 from players.random_player import RandomPlayer
@@ -14,6 +16,7 @@ screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
 pygame.display.set_caption("Chinese Checker - 2 Players")
 
 GRID = {}  # {(q, r): {'pos': (x, y), 'piece': name1/name2/None}}
+GOALS = ()  # goal corner cors of NAME1, NAME2
 PLAYER1 = None
 PLAYER2 = None
 NAME1 = "GRAVE"
@@ -21,6 +24,9 @@ NAME2 = "MCTS"
 WIN_THRESHOLD = 6 # 1-10
 MAX_MOVE_COUNT = 200
 C = 1.4
+TIME_LIMIT_MS = None  # per-move search deadline for the AI players, None: fixed simulations
+ADVERSARIAL = False  # AI players also search the opponent's replies
+BOOK_PATH = None  # sqlite opening book shared by the AI players across games, e.g. "opening_book.db"
 
 # TIME_DELAY = 100
 TIME_DELAY = 0
@@ -33,7 +39,8 @@ def switch_player(player):
 def ai_move(ai):
     print(f"-- {ai.name} move --")
     turn = None
-    piece, cor = ai.move(GRID)
+    # AI players search on the compact BoardState, not on the pygame GRID
+    piece, cor = ai.move(BoardState.from_grid(GRID, (NAME1, NAME2), GOALS))
     if piece and cor:
         GRID[cor]['piece'] = GRID[piece]['piece']
         GRID[piece]['piece'] = None
@@ -68,16 +75,20 @@ def human_move(human, clicked_cor):
 def main():
     clock = pygame.time.Clock()
 
-    global GRID, NAME1, NAME2, PLAYER1, PLAYER2
+    global GRID, GOALS, NAME1, NAME2, PLAYER1, PLAYER2
     GRID, corner_cors1, corner_cors2 = init_gird(NAME1, NAME2)
+    GOALS = (corner_cors2, corner_cors1)
     print("GRID: ", GRID)
 
     # PLAYER1 = RandomPlayer(NAME1, corner_cors2)
     # PLAYER1 = MCTSPlayer(NAME1, corner_cors2, simulations=300)
-    PLAYER1 = GRAVEPlayer(NAME1, corner_cors2, simulations=300, c=C)
+    book = OpeningBook(BOOK_PATH) if BOOK_PATH else None
+    PLAYER1 = GRAVEPlayer(NAME1, corner_cors2, simulations=300, c=C, time_limit_ms=TIME_LIMIT_MS,
+                          adversarial=ADVERSARIAL, book=book, win_threshold=WIN_THRESHOLD)
     # PLAYER2 = HumanPlayer(NAME2, corner_cors1)
     # PLAYER2 = RandomPlayer(NAME2, corner_cors1)
-    PLAYER2 = MCTSPlayer(NAME2, corner_cors1, simulations=300, c=C)
+    PLAYER2 = MCTSPlayer(NAME2, corner_cors1, simulations=300, c=C, time_limit_ms=TIME_LIMIT_MS,
+                         adversarial=ADVERSARIAL, book=book, win_threshold=WIN_THRESHOLD)
     player = PLAYER2
     selected_piece = None
     winner = None
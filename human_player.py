@@ -1,4 +1,4 @@
-from board import get_possible_cors
+from movegen import get_possible_cors
 
 
 class HumanPlayer:
@@ -34,7 +34,7 @@ class HumanPlayer:
     def check_move(self, clicked_cor, grid):
         can_move = False
         if self.selected_piece is not None and self.selected_piece != clicked_cor:
-            cors = get_possible_cors(self.selected_piece, grid)
+            cors = get_possible_cors(grid, self.selected_piece)
             if clicked_cor in cors:
                 can_move = True
 
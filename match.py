@@ -0,0 +1,109 @@
+import ast
+import contextlib
+import io
+import random
+
+from board import init_gird
+from board_state import BoardState
+from evaluation import make_evaluator
+from movegen import get_legal_moves
+from opening_book import OpeningBook
+from players.grave_player import GRAVEPlayer
+from players.mcts_player import MCTSPlayer
+from players.random_player import RandomPlayer
+from players.rave_player import RAVEPlayer
+
+# Same rules as game.py
+WIN_THRESHOLD = 6
+MAX_MOVE_COUNT = 200
+
+AGENT_TYPES = {
+    "MCTS": MCTSPlayer,
+    "RAVE": RAVEPlayer,
+    "GRAVE": GRAVEPlayer,
+    "Random": RandomPlayer,
+}
+
+
+def parse_value(text):
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+
+def parse_agent(spec):
+    # "GRAVE" or "GRAVE:simulations=300,c=1.4" -> ("GRAVE", {"simulations": 300, "c": 1.4})
+    agent_type, _, options_text = spec.partition(":")
+    if agent_type not in AGENT_TYPES:
+        raise ValueError(f"Unknown agent type: {agent_type} (expected one of {', '.join(AGENT_TYPES)})")
+    options = {}
+    for option in filter(None, options_text.split(",")):
+        key, sep, value = option.partition("=")
+        if not sep:
+            raise ValueError(f"Bad agent option '{option}' in '{spec}', expected key=value")
+        options[key.strip()] = parse_value(value.strip())
+    return agent_type, options
+
+
+def get_names(agent1, agent2):
+    # Agents are named by type, as in game.py; a mirror match gets numbered names
+    name1, name2 = agent1[0], agent2[0]
+    if name1 == name2:
+        name1, name2 = name1 + "1", name2 + "2"
+    return name1, name2
+
+
+def make_player(agent, name, corner_cors, win_threshold):
+    agent_type, options = agent
+    player_cls = AGENT_TYPES[agent_type]
+    if isinstance(options.get("book"), str):
+        # "book=openings.db" in an agent spec: the sqlite file of an OpeningBook
+        options = {**options, "book": OpeningBook(options["book"])}
+    if isinstance(options.get("evaluator"), str):
+        # "evaluator=linear": one of evaluation.EVALUATORS
+        options = {**options, "evaluator": make_evaluator(options["evaluator"])}
+    if player_cls in (RandomPlayer, RAVEPlayer):
+        return player_cls(name, corner_cors, win_threshold, **options)
+    return player_cls(name, corner_cors, win_threshold=win_threshold, **options)
+
+
+def play_game(agent1, agent2, win_threshold=WIN_THRESHOLD, max_moves=MAX_MOVE_COUNT, verbose=False, seed=None,
+              names=None, move_stats=None):
+    # Plays one game without any display. Returns (winner name or None, move count).
+    # move_stats: list that gets a row per move of an instrumented player, with
+    # the move number, the player and its SearchStats fields.
+    if seed is not None:
+        random.seed(seed)
+    name1, name2 = names or get_names(agent1, agent2)
+    grid, corner_cors1, corner_cors2 = init_gird(name1, name2)
+    player1 = make_player(agent1, name1, corner_cors2, win_threshold)
+    player2 = make_player(agent2, name2, corner_cors1, win_threshold)
+    state = BoardState.from_grid(grid, (name1, name2), (corner_cors2, corner_cors1))
+
+    # As in game.py, player 2 moves first
+    player = player2
+    count = 0
+    while count < max_moves:
+        code = state.code(player.name)
+        # A side without a legal hop passes
+        if get_legal_moves(state, code):
+            if verbose:
+                piece, cor = player.move(state)
+            else:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    piece, cor = player.move(state)
+            if move_stats is not None and getattr(player, "search_stats", None) is not None:
+                move_stats.append({"move": count + 1, "player": player.name, **player.search_stats.as_dict()})
+            state.apply((state.table.index[piece], state.table.index[cor]))
+            if state.get_n_pieces_goal(code) >= win_threshold:
+                return player.name, count + 1
+        player = player1 if player is player2 else player2
+        count += 1
+
+    n_goal1, n_goal2 = state.get_n_pieces_goal(1), state.get_n_pieces_goal(2)
+    if n_goal1 > n_goal2:
+        return name1, count
+    if n_goal2 > n_goal1:
+        return name2, count
+    return None, count
@@ -0,0 +1,100 @@
+from board_state import EMPTY, get_cell_table
+
+# (dr, dq) of the six hex directions
+DIRECTIONS = [(0, -1), (0, 1), (-1, 0), (1, 0), (1, -1), (-1, 1)]
+
+# Default of the multi_jump parameters: a move chains any number of hops; False:
+# a move is a single hop
+MULTI_JUMP = True
+
+# Moves of one piece per (piece, occupancy bitmask), per board layout and
+# multi_jump rule. A cache is shared by both sides and cleared when it reaches
+# MAX_MOVE_CACHE entries.
+MAX_MOVE_CACHE = 100000
+
+_JUMP_TABLES = {}
+_MOVE_CACHES = {}
+
+
+def get_jump_table(table):
+    # jumps[i] = ((over, land), ...) for every direction whose landing cell is on the board
+    jumps = _JUMP_TABLES.get(table)
+    if jumps is None:
+        jumps = []
+        for r, q in table.cors:
+            pairs = []
+            for dr, dq in DIRECTIONS:
+                over = table.index.get((r + dr, q + dq))
+                land = table.index.get((r + 2 * dr, q + 2 * dq))
+                if over is not None and land is not None:
+                    pairs.append((over, land))
+            jumps.append(tuple(pairs))
+        jumps = tuple(jumps)
+        _JUMP_TABLES[table] = jumps
+    return jumps
+
+
+def get_move_cache(table, multi_jump):
+    cache = _MOVE_CACHES.get((table, multi_jump))
+    if cache is None:
+        cache = {}
+        _MOVE_CACHES[(table, multi_jump)] = cache
+    return cache
+
+
+def find_moves(jumps, cells, i, multi_jump=True):
+    # Moves of the piece on cell i, breadth first over chained hops (single hops
+    # without multi_jump). The piece has left i while it jumps; visited is a
+    # bitmask of the cells already reached.
+    visited = 1 << i
+    moves = []
+    frontier = [i]
+    for cell in frontier:  # grows while it is walked: a BFS queue
+        for over, land in jumps[cell]:
+            if cells[over] != EMPTY and cells[land] == EMPTY and not visited >> land & 1 and over != i:
+                visited |= 1 << land
+                moves.append((i, land))
+                if multi_jump:
+                    frontier.append(land)
+    return tuple(moves)
+
+
+def get_piece_moves(table, cells, occupied, i, multi_jump=None):
+    # All (i, to_index) moves of the piece on cell i; occupied is the bitmask of
+    # the non-empty cells, the cache key along with i. multi_jump=None: MULTI_JUMP
+    if multi_jump is None:
+        multi_jump = MULTI_JUMP
+    cache = get_move_cache(table, multi_jump)
+    key = (i, occupied)
+    moves = cache.get(key)
+    if moves is None:
+        moves = find_moves(get_jump_table(table), cells, i, multi_jump)
+        if len(cache) >= MAX_MOVE_CACHE:
+            cache.clear()
+        cache[key] = moves
+    return moves
+
+
+def get_legal_moves(state, code, multi_jump=None):
+    # All (from_index, to_index) moves for the side playing with piece code `code`
+    if multi_jump is None:
+        multi_jump = MULTI_JUMP
+    table = state.table
+    cells = state.cells
+    occupied = state.occupied
+    cache = get_move_cache(table, multi_jump)
+    moves = []
+    for piece in state.get_pieces(code):
+        piece_moves = cache.get((piece, occupied))
+        if piece_moves is None:
+            piece_moves = get_piece_moves(table, cells, occupied, piece, multi_jump)
+        moves.extend(piece_moves)
+    return moves
+
+
+def get_possible_cors(grid, cor, multi_jump=None):
+    # Destinations of the piece on `cor` of a pygame GRID, for players that work on the grid
+    table = get_cell_table(grid.keys())
+    cells = bytearray(grid[c]['piece'] is not None for c in table.cors)
+    occupied = sum(1 << i for i, taken in enumerate(cells) if taken)
+    return [table.cors[land] for _, land in get_piece_moves(table, cells, occupied, table.index[cor], multi_jump)]
@@ -0,0 +1,49 @@
+def count_nodes(root):
+    n_nodes = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        n_nodes += 1
+        stack.extend(node.children)
+    return n_nodes
+
+
+def recycle(root, n_free):
+    # Drops the least visited subtrees below root until at least n_free nodes are
+    # gone (or only the root is left) and returns the number of nodes dropped. A
+    # dropped child's move goes back to the bottom of its parent's untried stack,
+    # so the search can expand it again later.
+    order = []  # nodes below the root, parents before their children
+    stack = list(root.children)
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        stack.extend(node.children)
+    sizes = {}
+    for node in reversed(order):
+        sizes[node] = 1 + sum(sizes[child] for child in node.children)
+
+    dropped = set()
+    n_dropped = 0
+    # Children before their parents on equal visits, so the smaller subtree goes first
+    for node in sorted(reversed(order), key=lambda node: node.visits):
+        if n_dropped >= n_free:
+            break
+        ancestor = node.parent
+        while ancestor is not root and ancestor not in dropped:
+            ancestor = ancestor.parent
+        if ancestor is not root:
+            continue  # already gone with a dropped ancestor
+        dropped.add(node)
+        n_dropped += sizes[node]
+        ancestor = node.parent
+        while ancestor is not root:
+            sizes[ancestor] -= sizes[node]
+            ancestor = ancestor.parent
+
+    by_parent = {}
+    for node in dropped:
+        by_parent.setdefault(node.parent, set()).add(node)
+    for parent, children in by_parent.items():
+        parent.remove_children(children)
+    return n_dropped
@@ -0,0 +1,194 @@
+import argparse
+import csv
+import os
+import random
+import sqlite3
+
+from movegen import get_legal_moves
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS positions (
+    kind TEXT, key INTEGER, visits INTEGER,
+    PRIMARY KEY (kind, key));
+CREATE TABLE IF NOT EXISTS moves (
+    kind TEXT, key INTEGER, from_cell INTEGER, to_cell INTEGER, visits INTEGER, total_reward REAL,
+    PRIMARY KEY (kind, key, from_cell, to_cell));
+"""
+
+
+def book_kind(player):
+    # One kind per search algorithm: RAVE and GRAVE share a role and a reward but
+    # not their searches. Players with different rewards don't share entries either.
+    kind = player.label.lower()
+    if getattr(player, "adversarial", False):
+        kind += "/adversarial"
+    # The players' own heuristic is named after their role and adds nothing
+    name = player.evaluator.name
+    if name is not None and name != player.role:
+        kind += "/" + name
+    return kind
+
+
+def position_key(state, code):
+    # Zobrist hash of the position with `code` to move, as a signed 64-bit sqlite integer
+    key = state.hash ^ state.table.side_keys[code]
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+class OpeningBook:
+    # sqlite table of root statistics, keyed by position hash and side to move.
+    # After each search the visits and rewards the root children gained in it
+    # are added to the position's entry; a later search of the same position starts from them
+    # (scaled down to max_prior visits in total), or plays the most visited book
+    # move without searching once the position has skip_visits visits. At most
+    # max_positions positions are kept, the least visited tenth is dropped when
+    # the book is full.
+    def __init__(self, path, max_positions=10000, skip_visits=None, max_prior=100, warm_start=True):
+        self.path = path
+        self.max_positions = max_positions
+        self.skip_visits = skip_visits
+        self.max_prior = max_prior
+        self.warm_start = warm_start
+        self.conn = None
+
+    def __getstate__(self):
+        # Sent to pool workers with the player: each process opens its own connection
+        state = self.__dict__.copy()
+        state['conn'] = None
+        return state
+
+    def connect(self):
+        if self.conn is None:
+            # Tournament workers share the file; wait for each other's writes
+            self.conn = sqlite3.connect(self.path, timeout=30)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+        return self.conn
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def lookup(self, kind, state, code):
+        # {move: (visits, total_reward)} of the position, {} when it isn't in the book
+        rows = self.connect().execute(
+            "SELECT from_cell, to_cell, visits, total_reward FROM moves WHERE kind = ? AND key = ?",
+            (kind, position_key(state, code)))
+        return {(from_cell, to_cell): (visits, total_reward) for from_cell, to_cell, visits, total_reward in rows}
+
+    def best_move(self, kind, state, code):
+        # Most visited book move when the position is known well enough to skip the search
+        if self.skip_visits is None:
+            return None
+        row = self.connect().execute(
+            "SELECT visits FROM positions WHERE kind = ? AND key = ?", (kind, position_key(state, code))).fetchone()
+        if row is None or row[0] < self.skip_visits:
+            return None
+        entry = self.lookup(kind, state, code)
+        legal = set(get_legal_moves(state, code))
+        moves = [move for move in entry if move in legal]
+        if not moves:
+            return None
+        return max(moves, key=lambda move: entry[move][0])
+
+    def get_prior(self, kind, state, code):
+        # Book stats for warm-starting a root, scaled so the visits sum to at most max_prior
+        if not self.warm_start:
+            return {}
+        entry = self.lookup(kind, state, code)
+        total = sum(visits for visits, _ in entry.values())
+        if total <= self.max_prior:
+            return entry
+        scale = self.max_prior / total
+        prior = {}
+        for move, (visits, total_reward) in entry.items():
+            scaled = int(visits * scale)
+            if scaled > 0:
+                prior[move] = (scaled, total_reward / visits * scaled)
+        return prior
+
+    def record(self, kind, state, code, root, prior=None):
+        # prior: {move: (visits, total_reward)} the root children were warm-started
+        # with, taken off so the book doesn't count its own stats again
+        prior = prior or {}
+        key = position_key(state, code)
+        rows = []
+        for child in root.children:
+            prior_visits, prior_reward = prior.get(child.move, (0, 0))
+            if child.visits > prior_visits:
+                rows.append((kind, key, child.move[0], child.move[1], child.visits - prior_visits,
+                             child.total_reward - prior_reward))
+        if not rows:
+            return
+        conn = self.connect()
+        with conn:
+            conn.executemany(
+                "INSERT INTO moves VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (kind, key, from_cell, to_cell) DO UPDATE "
+                "SET visits = visits + excluded.visits, total_reward = total_reward + excluded.total_reward", rows)
+            conn.execute(
+                "INSERT INTO positions VALUES (?, ?, ?) ON CONFLICT (kind, key) DO UPDATE "
+                "SET visits = visits + excluded.visits", (kind, key, sum(row[4] for row in rows)))
+            n_positions = conn.execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+            if n_positions > self.max_positions:
+                self.evict(conn, max(1, n_positions // 10))
+
+    def evict(self, conn, n_evict):
+        conn.execute(
+            "DELETE FROM positions WHERE rowid IN (SELECT rowid FROM positions ORDER BY visits LIMIT ?)", (n_evict,))
+        conn.execute("DELETE FROM moves WHERE (kind, key) NOT IN (SELECT kind, key FROM positions)")
+
+    def get_size(self):
+        return self.connect().execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+
+
+def warm_start(root, prior, moves, make_child):
+    # Gives a fresh root one child per book move of `prior`, carrying its stats;
+    # the other legal moves are left untried
+    for move in moves:
+        if move in prior:
+            child = make_child(move)
+            child.visits, child.total_reward = prior[move]
+            root.visits += child.visits
+            root.add_child(child)
+    root.untried_moves = [move for move in moves if move not in prior]
+    random.shuffle(root.untried_moves)
+
+
+def main():
+    # Builds a book offline by replaying the openings of a tournament's games:
+    # every game of the per-game record is replayed from its seed for --plies
+    # moves, with the same agents, and each search is added to the book.
+    from match import get_names, parse_agent, play_game
+    from tournament import with_c
+
+    parser = argparse.ArgumentParser(description="Build an opening book from tournament game records.")
+    parser.add_argument("record", help="games_{name1}_{name2}_{c}.csv written by tournament.py")
+    parser.add_argument("--book", default="opening_book.db")
+    parser.add_argument("--agent1", required=True, help="--agent1 of the tournament")
+    parser.add_argument("--agent2", required=True, help="--agent2 of the tournament")
+    parser.add_argument("--c", type=float, default=1.4)
+    parser.add_argument("--plies", type=int, default=10, help="opening moves of each game to add")
+    parser.add_argument("--max-positions", type=int, default=10000)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.record):
+        raise SystemExit(f"No such game record: {args.record}")
+    agent1 = with_c(parse_agent(args.agent1), args.c)
+    agent2 = with_c(parse_agent(args.agent2), args.c)
+    names = get_names(agent1, agent2)
+
+    # Record only: the replayed searches must not be changed by the book they fill
+    book = OpeningBook(args.book, max_positions=args.max_positions, warm_start=False)
+    agent1 = (agent1[0], {**agent1[1], "book": book})
+    agent2 = (agent2[0], {**agent2[1], "book": book})
+    with open(args.record, newline="") as f:
+        rows = list(csv.DictReader(f))
+    for row in rows:
+        play_game(agent1, agent2, max_moves=args.plies, seed=int(row["seed"]), names=names)
+        print(f"game {row['game']}: {book.get_size()} positions in {args.book}")
+    book.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+_EXECUTORS = {}
+
+AMAF_FIELDS = ("amaf",)
+
+VECTOR_BATCH = 128  # static leaf batches from this size on are scored by NumPy, see evaluate_batch
+
+
+def get_executor(n_workers):
+    # Pools are kept for the whole process so every move doesn't pay the worker startup
+    executor = _EXECUTORS.get(n_workers)
+    if executor is None:
+        executor = ProcessPoolExecutor(max_workers=n_workers)
+        _EXECUTORS[n_workers] = executor
+    return executor
+
+
+def get_root_stats(root, book_prior):
+    # Root statistics of a finished search, small enough to send back from a worker.
+    # book_prior: {move: (visits, total_reward)} the search started from, see
+    # SearchPlayer.get_book_prior
+    stats = {
+        "visits": root.visits,
+        "children": [(child.move, child.visits, child.total_reward) for child in root.children],
+        "book_prior": book_prior,
+    }
+    for field in AMAF_FIELDS:
+        if hasattr(root, field):
+            stats[field] = getattr(root, field)
+    return stats
+
+
+def merge_root_stats(node_cls, all_stats):
+    # The merged root and the summed book priors of the workers
+    root = node_cls(state=None)
+    children = {}
+    book_prior = {}
+    for stats in all_stats:
+        root.visits += stats["visits"]
+        for move, visits, total_reward in stats["children"]:
+            child = children.get(move)
+            if child is None:
+                child = node_cls(state=None, parent=root, move=move)
+                children[move] = child
+                root.add_child(child)
+            child.visits += visits
+            child.total_reward += total_reward
+        for move, (visits, total_reward) in stats["book_prior"].items():
+            prior_visits, prior_reward = book_prior.get(move, (0, 0))
+            book_prior[move] = (prior_visits + visits, prior_reward + total_reward)
+        for field in AMAF_FIELDS:
+            if field in stats:
+                merged = getattr(root, field)
+                for move, value in stats[field].items():
+                    merged[move] = merged.get(move, 0) + value
+    for child in root.children:
+        root.update_child(child)
+    return root, book_prior
+
+
+def search_root(player, state, seed, elapsed):
+    # elapsed: seconds of the move already spent when the search was sent off,
+    # counted against the worker's deadline as well
+    random.seed(seed)
+    root = player.search(state, time.perf_counter() - elapsed)
+    return get_root_stats(root, player.get_book_prior(root))
+
+
+def root_parallel_search(player, state, node_cls, start_time=None):
+    # Independent searches from the same root, one per worker with its own seed,
+    # merged into a single root whose children carry the summed statistics.
+    # Returns the root and the summed book priors of its children.
+    executor = get_executor(player.n_workers)
+    seeds = [random.getrandbits(32) for _ in range(player.n_workers)]
+    elapsed = time.perf_counter() - start_time if start_time is not None else 0
+    futures = [executor.submit(search_root, player, state, seed, elapsed) for seed in seeds]
+    return merge_root_stats(node_cls, [future.result() for future in futures])
+
+
+def evaluate_leaves(player, leaves, seed):
+    random.seed(seed)
+    return [player.evaluate(state, to_move) for state, to_move in leaves]
+
+
+def evaluate_batch(player, leaves):
+    # (state, side to move) leaves collected by tree-parallel descents. Static
+    # evaluation is cheaper than a round trip to a worker, so only playouts are
+    # sent to the pool. Each static reward is O(1) from the state's incremental
+    # distance sums, so NumPy only pays off from VECTOR_BATCH leaves on.
+    if player.rollout is None and len(leaves) >= VECTOR_BATCH:
+        return player.default_policy_batch([state for state, _ in leaves])
+    n_workers = min(player.tree_workers, len(leaves))
+    if player.rollout is None or n_workers == 1:
+        return [player.evaluate(state, to_move) for state, to_move in leaves]
+
+    executor = get_executor(player.tree_workers)
+    futures = [
+        executor.submit(evaluate_leaves, player, leaves[i::n_workers], random.getrandbits(32))
+        for i in range(n_workers)
+    ]
+    rewards = [None] * len(leaves)
+    for i, future in enumerate(futures):
+        rewards[i::n_workers] = future.result()
+    return rewards
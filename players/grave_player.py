@@ -1,146 +1,107 @@
-import math
-import random
-from board import get_possible_cors
-
-
-class GRAVENode:
-    def __init__(self, state, parent=None, move=None):
-        self.state = state
-        self.parent = parent
-        self.move = move
-        self.children = []
-        self.visits = 0
-        self.total_reward = 0
-        self.untried_moves = None
-
-        # GRAVE
-        self.amaf_visits = {}  # move -> int
-        self.amaf_total_reward = {}    # move -> float
-
-    def get_all_moves(self, player_name):
-        pieces = [cor for cor, cell in self.state.items() if cell['piece'] == player_name]
-        moves = []
-        for piece in pieces:
-            for to in get_possible_cors(piece, self.state):
-                moves.append((piece, to))
-        return moves
-
-    def is_fully_expanded(self, player_name):
-        if self.untried_moves is None:
-            self.untried_moves = self.get_all_moves(player_name)
-        tried_moves = [child.move for child in self.children]
-        return len(tried_moves) >= len(self.untried_moves)
-
-    def best_child(self, c_param=1.4):
-        def grave_score(child):
-            move = child.move
-            q = child.total_reward / child.visits if child.visits > 0 else 0
-            amaf_v = self.amaf_visits.get(move, 0)
-            amaf_w = self.amaf_total_reward.get(move, 0)
-            q_amaf = amaf_w / amaf_v if amaf_v > 0 else 0
-
-            beta = child.visits / (child.visits + amaf_v + 1e-6)
-            grave_q = beta * q + (1 - beta) * q_amaf
-
-            return grave_q + c_param * math.sqrt(math.log(self.visits + 1) / (child.visits + 1))
-
-        return max(self.children, key=grave_score)
-
-
-class GRAVEPlayer:
-    def __init__(self, name, corner_cors, simulations=100, c=1.4):
-        self.role = "grave"
-        self.name = name
-        self.corner_cors = corner_cors
-        self.simulations = simulations
+from transposition import SharedStatsNode
+from players.search_node import AMAFNode
+from players.search_player import SearchPlayer
+
+
+class GRAVENode(AMAFNode):
+    __slots__ = ()
+
+
+class SharedGRAVENode(SharedStatsNode, GRAVENode):
+    # GRAVENode with stats shared through a transposition table
+    __slots__ = ('stats',)
+
+
+class GRAVEPlayer(SearchPlayer):
+    role = "grave"
+    label = "GRAVE"
+    distance_offset = 1
+    node_type = GRAVENode
+
+    def __init__(self, name, corner_cors, simulations=100, c=1.4, store_states=True, rollout=None, n_workers=1,
+                 tree_workers=1, virtual_loss=1, time_limit_ms=None, early_stop=False, reuse_tree=True,
+                 transpositions=None, instrument=False, adversarial=False, book=None, evaluator=None,
+                 widening=None, widening_alpha=0.5, prune_backward=False, max_nodes=None,
+                 win_threshold=None):
+        super().__init__(name, corner_cors, simulations, rollout=rollout, evaluator=evaluator, n_workers=n_workers,
+                         time_limit_ms=time_limit_ms, early_stop=early_stop, reuse_tree=reuse_tree,
+                         instrument=instrument, book=book, widening=widening, widening_alpha=widening_alpha,
+                         prune_backward=prune_backward, max_nodes=max_nodes, win_threshold=win_threshold)
+        self.tree_workers = tree_workers  # > 1: tree-parallel descents per batch, see search_parallel
+        self.virtual_loss = virtual_loss
+        self.transpositions = transpositions  # TranspositionTable shared by the nodes of one search
+        self.node_cls = GRAVENode if transpositions is None else SharedGRAVENode
         self.c = c
 
-    def get_pieces(self, grid):
-        return [cor for cor, cell in grid.items() if cell['piece'] == self.name]
+        # adversarial=True: the tree alternates our moves and the opponent's, each
+        # node's total_reward is from the view of the side that played its move and
+        # its AMAF stats from the view of the side to move there (rewards are
+        # zero-sum, see default_policy), and a win of either side ends a descent.
+        # Otherwise only our moves are searched, over a frozen opponent.
+        self.adversarial = adversarial
 
-    def move(self, grid):
-        root = GRAVENode(state=self.deepcopy_grid(grid))
-
-        for _ in range(self.simulations):
-            node, path, played_moves = self.tree_policy(root)
-            reward = self.default_policy(node.state)
-            self.backup(path, played_moves, reward)
-
-        best_child = root.best_child(c_param=0)
-        print("GRAVE selected move:", best_child.move)
-        return best_child.move
+        # store_states=False: nodes keep only their move and the search replays
+        # moves on self.board with apply/undo while descending
+        self.store_states = store_states
 
     def tree_policy(self, node):
+        # The descent is the path and the moves played along it, by side
         path = []
-        played_moves = set()
+        played_moves = (set(), set())  # moves of the descent, by piece code - 1 of the side playing them
 
-        while not self.is_terminal(node.state):
+        while not self.is_terminal(self.node_state(node)):
             path.append(node)
-            if not node.is_fully_expanded(self.name):
+            if not node.is_fully_expanded(self.node_state(node), node.to_move, self.widening) and (
+                    self.widening is None or self.widening.allows(node)):
                 new_node = self.expand(node)
                 path.append(new_node)
-                played_moves.add(new_node.move)
-                return new_node, path, played_moves
+                played_moves[node.to_move - 1].add(new_node.move)
+                return new_node, (path, played_moves)
+            elif not node.children:
+                # The side to move has no legal move: evaluate the position as it is
+                return node, (path, played_moves)
             else:
+                parent = node
                 node = node.best_child(self.c)
-                played_moves.add(node.move)
-
-        return node, path, played_moves
-
-    def expand(self, node):
-        if node.untried_moves is None:
-            node.untried_moves = node.get_all_moves(self.name)
-
-        tried_moves = [child.move for child in node.children]
-        untried = [move for move in node.untried_moves if move not in tried_moves]
-
-        if not untried:
-            return random.choice(node.children)
-
-        move = random.choice(untried)
-        new_state = self.simulate_move(node.state, move)
-        child = GRAVENode(state=new_state, parent=node, move=move)
-        node.children.append(child)
-        return child
-
-    def default_policy(self, state):
-        # Minimize the average distance between chess pieces and the target angle
-        pieces = [cor for cor, cell in state.items() if cell['piece'] == self.name]
-        if not pieces:
-            return 0
-        total = 0
-        for piece in pieces:
-            min_dist = min(self.hex_distance(piece, goal) for goal in self.corner_cors)
-            total += min_dist
-        return 1 / (1 + total / len(pieces))
-
-    def backup(self, path, played_moves, reward):
+                self.play(node)
+                played_moves[parent.to_move - 1].add(node.move)
+
+        return node, (path, played_moves)
+
+    def backup(self, descent, reward):
+        # reward is ours; in adversarial mode the opponent's view gets -reward
+        path, played_moves = descent
         for node in reversed(path):
+            mover_reward = side_reward = reward
+            if self.adversarial:
+                if node.to_move == self.code:
+                    mover_reward = -reward
+                else:
+                    side_reward = -reward
             node.visits += 1
-            node.total_reward += reward
-            for move in played_moves:
-                node.amaf_visits[move] = node.amaf_visits.get(move, 0) + 1
-                node.amaf_total_reward[move] = node.amaf_total_reward.get(move, 0) + reward
-
-    def simulate_move(self, grid, move):
-        new_grid = self.deepcopy_grid(grid)
-        from_cor, to_cor = move
-        new_grid[to_cor]['piece'] = new_grid[from_cor]['piece']
-        new_grid[from_cor]['piece'] = None
-        return new_grid
-
-    def is_terminal(self, state):
-        pieces = self.get_pieces(state)
-        return all(cor in self.corner_cors for cor in pieces)
-
-    def deepcopy_grid(self, grid):
-        return {cor: cell.copy() for cor, cell in grid.items()}
-
-    def hex_distance(self, a, b):
-        aq, ar = a
-        bq, br = b
-        return (abs(aq - bq) + abs(ar - br) + abs((aq + ar) - (bq + br))) // 2
-
-    def get_n_pieces_corner(self, grid):
-        pieces = self.get_pieces(grid)
-        return sum(1 for p in pieces if p in self.corner_cors)
\ No newline at end of file
+            node.total_reward += mover_reward
+            amaf = node.amaf
+            update = complex(1, side_reward)  # one visit, see AMAFNode.amaf
+            for move in played_moves[node.to_move - 1]:
+                amaf[move] = amaf.get(move, 0j) + update
+                child = node.children_by_move.get(move)
+                if child is not None:
+                    node.update_child(child)
+
+    def add_virtual_loss(self, descent, loss):
+        # Count pending descents as lost visits. loss: the worst reward seen so far,
+        # 0 until a reward goes below it; in adversarial mode minus the largest
+        # one, so every node on the path is a loss for the side that played it.
+        for node in descent[0]:
+            node.visits += self.virtual_loss
+            node.total_reward += self.virtual_loss * loss
+            if node.parent is not None:
+                node.parent.update_child(node)
+
+    def remove_virtual_loss(self, descent, loss):
+        for node in descent[0]:
+            node.visits -= self.virtual_loss
+            node.total_reward -= self.virtual_loss * loss
+            if node.parent is not None:
+                node.parent.update_child(node)
+
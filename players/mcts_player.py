@@ -1,123 +1,96 @@
-import math
-import random
-from board import get_possible_cors
-
-class MCTSNode:
-    def __init__(self, state, parent=None, move=None):
-        self.state = state
-        self.parent = parent
-        self.move = move
-        self.children = []
-        self.visits = 0
-        self.total_reward = 0
-        self.untried_moves = None
-
-    def get_all_moves(self, player_name):
-        pieces = [cor for cor, cell in self.state.items() if cell['piece'] == player_name]
-        moves = []
-        for piece in pieces:
-            for to in get_possible_cors(piece, self.state):
-                moves.append((piece, to))
-        return moves
-
-    def is_fully_expanded(self, player_name):
-        if self.untried_moves is None:
-            self.untried_moves = self.get_all_moves(player_name)
-        tried_moves = [child.move for child in self.children]
-        return len(tried_moves) >= len(self.untried_moves)
-
-    def best_child(self, c_param=1.4):
-        return max(
-            self.children,
-            key=lambda child: (child.total_reward / child.visits if child.visits > 0 else 0)
-                               + c_param * math.sqrt(math.log(self.visits + 1) / (child.visits + 1))
-        )
-
-
-class MCTSPlayer:
-    def __init__(self, name, corner_cors, simulations=100, c=1.4):
-        self.role = "mcts"
-        self.name = name
-        self.corner_cors = corner_cors
-        self.simulations = simulations
+from transposition import SharedStatsNode
+from players.search_node import SearchNode
+from players.search_player import SearchPlayer
+
+
+class MCTSNode(SearchNode):
+    __slots__ = ()
+
+
+class SharedMCTSNode(SharedStatsNode, MCTSNode):
+    # MCTSNode with stats shared through a transposition table
+    __slots__ = ('stats',)
+
+
+class MCTSPlayer(SearchPlayer):
+    role = "mcts"
+    label = "MCTS"
+    distance_offset = 1e-6
+    node_type = MCTSNode
+
+    def __init__(self, name, corner_cors, simulations=100, c=1.4, store_states=True, rollout=None, n_workers=1,
+                 tree_workers=1, virtual_loss=1, time_limit_ms=None, early_stop=False, reuse_tree=True,
+                 transpositions=None, instrument=False, adversarial=False, book=None, evaluator=None,
+                 widening=None, widening_alpha=0.5, prune_backward=False, max_nodes=None,
+                 win_threshold=None):
+        super().__init__(name, corner_cors, simulations, rollout=rollout, evaluator=evaluator, n_workers=n_workers,
+                         time_limit_ms=time_limit_ms, early_stop=early_stop, reuse_tree=reuse_tree,
+                         instrument=instrument, book=book, widening=widening, widening_alpha=widening_alpha,
+                         prune_backward=prune_backward, max_nodes=max_nodes, win_threshold=win_threshold)
+        self.tree_workers = tree_workers  # > 1: tree-parallel descents per batch, see search_parallel
+        self.virtual_loss = virtual_loss
+        self.transpositions = transpositions  # TranspositionTable shared by the nodes of one search
+        self.node_cls = MCTSNode if transpositions is None else SharedMCTSNode
         self.c = c
 
-    def get_pieces(self, grid):
-        return [cor for cor, cell in grid.items() if cell['piece'] == self.name]
-
-    def move(self, grid):
-        root = MCTSNode(state=self.deepcopy_grid(grid))
-
-        for _ in range(self.simulations):
-            node = self.tree_policy(root)
-            reward = self.default_policy(node.state)
-            self.backup(node, reward)
+        # adversarial=True: the tree alternates our moves and the opponent's, each
+        # node's total_reward is from the view of the side that played its move
+        # (rewards are zero-sum, see default_policy), and a win of either side ends
+        # a descent. Otherwise only our moves are searched, over a frozen opponent.
+        self.adversarial = adversarial
 
-        best_child = root.best_child(c_param=0)
-        print("MCTS selected move:", best_child.move)
-        return best_child.move
+        # store_states=False: nodes keep only their move and the search replays
+        # moves on self.board with apply/undo while descending
+        self.store_states = store_states
 
     def tree_policy(self, node):
-        while not self.is_terminal(node.state):
-            if not node.is_fully_expanded(self.name):
-                return self.expand(node)
+        # The descent is the leaf itself: backup follows its parents
+        while not self.is_terminal(self.node_state(node)):
+            if not node.is_fully_expanded(self.node_state(node), node.to_move, self.widening) and (
+                    self.widening is None or self.widening.allows(node)):
+                node = self.expand(node)
+                return node, node
+            elif not node.children:
+                # The side to move has no legal move: evaluate the position as it is
+                return node, node
             else:
                 node = node.best_child(self.c)
-        return node
-
-    def expand(self, node):
-        if node.untried_moves is None:
-            node.untried_moves = node.get_all_moves(self.name)
-
-        tried_moves = [child.move for child in node.children]
-        untried = [move for move in node.untried_moves if move not in tried_moves]
-
-        if not untried:
-            return random.choice(node.children)
-
-        move = random.choice(untried)
-        new_state = self.simulate_move(node.state, move)
-        child_node = MCTSNode(state=new_state, parent=node, move=move)
-        node.children.append(child_node)
-        return child_node
-
-    def default_policy(self, state):
-        # Minimize the average distance between chess pieces and the target angle
-        total_distance = 0
-        pieces = [cor for cor, cell in state.items() if cell['piece'] == self.name]
-        for piece in pieces:
-            min_dist = min(self.hex_distance(piece, target) for target in self.corner_cors)
-            total_distance += min_dist
-        if not pieces:
-            return 0
-        avg_distance = total_distance / len(pieces)
-        return 1 / (avg_distance + 1e-6)
+                self.play(node)
+        return node, node
 
     def backup(self, node, reward):
+        # reward is ours; in adversarial mode it flips sign at every level, so the
+        # opponent's moves are credited from the opponent's view
+        if self.adversarial and node.to_move == self.code:
+            reward = -reward
         while node is not None:
             node.visits += 1
             node.total_reward += reward
-            node = node.parent
-
-    def simulate_move(self, state, move):
-        new_state = self.deepcopy_grid(state)
-        from_cor, to_cor = move
-        new_state[to_cor]['piece'] = new_state[from_cor]['piece']
-        new_state[from_cor]['piece'] = None
-        return new_state
-
-    def is_terminal(self, state):
-        pieces = self.get_pieces(state)
-        return all(cor in self.corner_cors for cor in pieces)
-
-    def hex_distance(self, a, b):
-        aq, ar = a
-        bq, br = b
-        return (abs(aq - bq) + abs(ar - br) + abs((aq + ar) - (bq + br))) // 2
-
-    def deepcopy_grid(self, grid):
-        return {cor: cell.copy() for cor, cell in grid.items()}
+            parent = node.parent
+            if parent is not None:
+                parent.update_child(node)
+            if self.adversarial:
+                reward = -reward
+            node = parent
+
+    def add_virtual_loss(self, node, loss):
+        # Count pending descents as lost visits. loss: the worst reward seen so far,
+        # 0 until a reward goes below it; in adversarial mode minus the largest
+        # one, so every node on the path is a loss for the side that played it.
+        while node is not None:
+            node.visits += self.virtual_loss
+            node.total_reward += self.virtual_loss * loss
+            parent = node.parent
+            if parent is not None:
+                parent.update_child(node)
+            node = parent
+
+    def remove_virtual_loss(self, node, loss):
+        while node is not None:
+            node.visits -= self.virtual_loss
+            node.total_reward -= self.virtual_loss * loss
+            parent = node.parent
+            if parent is not None:
+                parent.update_child(node)
+            node = parent
 
-    def get_n_pieces_corner(self, grid):
-        pieces = self.get_pieces(grid)
-        return sum(1 for p in pieces if p in self.corner_cors)
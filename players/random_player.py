@@ -1,6 +1,6 @@
 import random
 
-from board import get_possible_cors
+from movegen import get_legal_moves
 
 
 class RandomPlayer:
@@ -13,13 +13,8 @@ class RandomPlayer:
     def get_pieces(self, grid):
         return [cor for cor, cell in grid.items() if cell['piece'] == self.name]
 
-    def move(self, grid):
-        pieces = self.get_pieces(grid)
-        moves = []
-        for piece in pieces:
-            cors = get_possible_cors(piece, grid)
-            moves_piece = [(piece, cor) for cor in cors]
-            moves.extend(moves_piece)
+    def move(self, state):
+        moves = [state.to_cors(move) for move in get_legal_moves(state, state.code(self.name))]
 
         print("Ramdom moves:", moves)
         return random.choice(moves)
@@ -0,0 +1,114 @@
+import random
+from types import MappingProxyType
+
+from movegen import get_legal_moves
+from selection import uct_select
+
+# Shared read-only children_by_move of the nodes without children: most nodes
+# are leaves, so they don't get a dict each
+NO_CHILDREN = MappingProxyType({})
+
+
+class SearchNode:
+    # Tree node of the search players, selected by plain UCT over its children
+    __slots__ = ('state', 'parent', 'move', 'to_move', 'children', 'visits', 'total_reward', 'untried_moves',
+                 'child_visits', 'child_q', 'index')
+
+    def __init__(self, state, parent=None, move=None, to_move=None):
+        self.state = state
+        self.parent = parent
+        self.move = move
+        self.to_move = to_move  # piece code of the side to move at this node
+        self.children = ()  # a list from the first child on: most nodes are leaves
+        self.visits = 0
+        self.total_reward = 0
+        self.untried_moves = None  # stack of moves without a child, made on first visit
+
+        # Parallel to children: their visits and selection value, kept up to date
+        # by update_child so best_child doesn't read every child
+        self.child_visits = ()
+        self.child_q = ()
+        self.index = 0  # position in the parent's children
+
+    def get_all_moves(self, state, code):
+        return get_legal_moves(state, code)
+
+    def is_fully_expanded(self, state, code, widening=None):
+        if self.untried_moves is None:
+            moves = self.get_all_moves(state, code)
+            if widening is None:
+                random.shuffle(moves)
+            else:
+                moves = widening.order(state, code, moves)
+            self.untried_moves = moves
+        return not self.untried_moves
+
+    def add_child(self, child):
+        if not self.children:
+            self.children, self.child_visits, self.child_q = [], [], []
+        child.index = len(self.children)
+        self.children.append(child)
+        self.child_visits.append(0)
+        self.child_q.append(0)
+        self.update_child(child)
+
+    def set_children(self, children):
+        self.children = []
+        self.child_visits = []
+        self.child_q = []
+        for child in children:
+            self.add_child(child)
+
+    def remove_children(self, removed):
+        # removed: set of recycled children, see node_pool.recycle. Their moves go
+        # back to the bottom of the untried stack.
+        self.untried_moves[:0] = [child.move for child in self.children if child in removed]
+        self.set_children([child for child in self.children if child not in removed])
+
+    def update_child(self, child):
+        visits = child.visits
+        self.child_visits[child.index] = visits
+        self.child_q[child.index] = child.total_reward / visits if visits > 0 else 0
+
+    def best_child(self, c_param=1.4):
+        return uct_select(self.children, self.child_q, self.child_visits, self.visits, c_param)
+
+
+class AMAFNode(SearchNode):
+    # Node of the RAVE and GRAVE players: a child's value blends its own mean
+    # reward with the all-moves-as-first stats of its move at this node
+    __slots__ = ('amaf', 'children_by_move')
+
+    def __init__(self, state, parent=None, move=None, to_move=None):
+        super().__init__(state, parent, move, to_move)
+        # move -> complex(visits, total_reward): the AMAF stats of a move packed in
+        # one number. The tables hold an entry for every move played below the
+        # node, so they make up much of a GRAVE tree: a complex is 32 bytes, a
+        # [visits, total_reward] list with its float about 96 (a 20k-node GRAVE
+        # tree takes 24 MB with lists, 18 MB with complex). Visits are therefore
+        # floats, exact as long as they are counts below 2**53.
+        self.amaf = {}
+        self.children_by_move = NO_CHILDREN  # a dict from the first child on
+
+    def add_child(self, child):
+        if not self.children:
+            self.children_by_move = {}
+        self.children_by_move[child.move] = child
+        super().add_child(child)
+
+    def set_children(self, children):
+        self.children_by_move = NO_CHILDREN
+        super().set_children(children)
+
+    def update_child(self, child):
+        # Called when the child's stats or this node's AMAF stats of its move change
+        move = child.move
+        visits = child.visits
+        q = child.total_reward / visits if visits > 0 else 0
+        amaf = self.amaf.get(move, 0j)
+        amaf_v = amaf.real
+        q_amaf = amaf.imag / amaf_v if amaf_v > 0 else 0
+
+        beta = visits / (visits + amaf_v + 1e-6)
+        self.child_visits[child.index] = visits
+        self.child_q[child.index] = beta * q + (1 - beta) * q_amaf
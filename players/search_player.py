@@ -0,0 +1,340 @@
+import gc
+import random
+import time
+
+from evaluation import DistanceEvaluator
+from movegen import get_legal_moves
+from node_pool import count_nodes, recycle
+from opening_book import book_kind, warm_start
+from parallel import evaluate_batch, root_parallel_search
+from search_budget import SearchBudget
+from search_stats import instrumented_search
+from tree_reuse import reuse_subtree
+from widening import Widening
+
+FULL_GC_PAUSED = 1 << 30  # gc threshold of the oldest generation during a move, see SearchPlayer.move
+
+
+class SearchPlayer:
+    # What MCTSPlayer, GRAVEPlayer and RAVEPlayer share: the search loops,
+    # expansion and leaf evaluation, dispatch to the parallel modes, tree reuse,
+    # the budget and the anytime API. Subclasses implement tree_policy, which
+    # returns the leaf and the descent (whatever their backup and virtual loss
+    # take), backup, and set node_type, the node class of their trees.
+    role = None  # shown in the game window, also names the default evaluator
+    label = None  # name in the move printouts, also the opening book kind
+    distance_offset = 1  # offset of the default DistanceEvaluator
+    node_type = None
+
+    # Defaults for the players without these search modes
+    tree_workers = 1
+    transpositions = None
+    adversarial = False
+    store_states = True
+
+    def __init__(self, name, corner_cors, simulations, rollout=None, evaluator=None, n_workers=1,
+                 time_limit_ms=None, early_stop=False, reuse_tree=True, instrument=False, book=None,
+                 widening=None, widening_alpha=0.5, prune_backward=False, max_nodes=None,
+                 win_threshold=None):
+        self.name = name
+        self.corner_cors = corner_cors
+        self.code = None  # piece code on the BoardState, set per move
+        self.win_threshold = win_threshold  # pieces in the goal that win the game, None: all of them
+        self.simulations = simulations
+        self.rollout = rollout  # Rollout used to score leaves, None for the static heuristic
+        # Evaluator scoring leaves and playout ends, see evaluation
+        self.evaluator = evaluator if evaluator is not None else DistanceEvaluator(offset=self.distance_offset)
+        self.n_workers = n_workers  # > 1: root-parallel search over a process pool
+        self.time_limit_ms = time_limit_ms  # search until the deadline instead of `simulations` times
+        self.early_stop = early_stop
+        self.budget = None
+        self.root = None  # tree of the running or last search, see get_best_move
+        self.root_state = None
+        self.reuse_tree = reuse_tree  # keep the subtree of the move actually played for the next move
+        self.last_move = None
+        self.instrument = instrument  # time the search phases, see search_stats
+        self.search_stats = None  # SearchStats of the last move when instrumented
+        self.book = book  # OpeningBook: warm-starts searches of known positions, fed with each search
+        self.book_prior = {}  # root child -> (visits, total_reward) it was seeded with from the book
+        # max_nodes: cap on the tree size. When the cap is hit the least visited
+        # subtrees are recycled, see make_room.
+        self.max_nodes = max_nodes
+        self.n_nodes = 0  # nodes in the tree of the running search
+        self.node_cls = self.node_type  # class of the nodes made by this player
+        self.board = None  # copy of the searched position, see store_states
+        self.played = []  # moves applied to self.board in the current descent
+
+        # widening=k: progressive widening with factor k, see Widening. prune_backward
+        # skips the moves away from the goal. Either way untried moves are expanded
+        # best first instead of in random order.
+        self.widening = None
+        if widening is not None or prune_backward:
+            self.widening = Widening(widening, widening_alpha, prune_backward)
+
+    def get_pieces(self, grid):
+        return [cor for cor, cell in grid.items() if cell['piece'] == self.name]
+
+    def get_n_pieces_corner(self, grid):
+        pieces = self.get_pieces(grid)
+        return sum(1 for p in pieces if p in self.corner_cors)
+
+    def move(self, state):
+        # state: BoardState converted from the pygame GRID by the caller. The time
+        # limit counts from here, so it covers the book lookup and the tree setup.
+        start_time = time.perf_counter()
+        # No full garbage collection during the move: a growing tree makes no
+        # cyclic garbage, and a full collection walks the whole tree, far past the
+        # deadline on a big one. The young generations are still collected.
+        thresholds = gc.get_threshold()
+        gc.set_threshold(thresholds[0], thresholds[1], FULL_GC_PAUSED)
+        try:
+            return self.select_move(state, start_time)
+        finally:
+            gc.set_threshold(*thresholds)
+
+    def select_move(self, state, start_time):
+        if self.book is not None:
+            book_move = self.book.best_move(book_kind(self), state, state.code(self.name))
+            if book_move is not None:
+                # Known position: no search, so no tree to reuse next move either
+                self.root = None
+                self.last_move = None
+                move = state.to_cors(book_move)
+                print(f"{self.label} book move:", move)
+                return move
+
+        if self.instrument:
+            root, self.search_stats = instrumented_search(self, self.run_search, state, start_time)
+        else:
+            root = self.run_search(state, start_time)
+        if self.book is not None:
+            self.book.record(book_kind(self), state, state.code(self.name), root, self.get_book_prior(root))
+
+        best_child = self.final_child(root)
+        self.last_move = best_child.move
+        move = state.to_cors(best_child.move)
+        print(f"{self.label} selected move:", move)
+        return move
+
+    def run_search(self, state, start_time=None):
+        if self.n_workers > 1:
+            # The workers search copies of this player, so get_best_move sees the
+            # merged root only once they are all done, and stop() can't reach them
+            root, book_prior = root_parallel_search(self, state, self.node_type, start_time)
+            self.book_prior = {child: book_prior[child.move] for child in root.children if child.move in book_prior}
+            self.root_state = state.copy()
+            self.root = root
+            return root
+        if self.tree_workers > 1:
+            return self.search_parallel(state, start_time)
+        return self.search(state, start_time)
+
+    def search(self, state, start_time=None):
+        # start_time: perf_counter() time the move began, see SearchBudget. Taken
+        # before new_root, whose tree reuse and book warm-start count against it.
+        if start_time is None:
+            start_time = time.perf_counter()
+        self.code = state.code(self.name)
+        self.board = state.copy()
+        root = self.new_root(state)
+        self.start_search(state, root, start_time)
+
+        while not self.budget.exhausted(root):
+            self.make_room(root)
+            node, descent = self.tree_policy(root)
+            reward = self.evaluate(self.node_state(node), node.to_move)
+            self.backup(descent, reward)
+            self.restore_board()
+            self.budget.tick()
+
+        return root
+
+    def search_parallel(self, state, start_time=None):
+        # Tree parallelism on one shared tree: tree_workers descents per batch, each
+        # adding virtual loss along its path so the next one is steered to another
+        # branch, then the batch of leaves is evaluated together (playouts go to the
+        # process pool). Backups, including the AMAF tables, are applied one at a
+        # time on this thread once the batch is back, so they never race.
+        if start_time is None:
+            start_time = time.perf_counter()
+        self.code = state.code(self.name)
+        self.board = state.copy()
+        root = self.new_root(state)
+        self.start_search(state, root, start_time)
+
+        loss = 0  # reward of a lost descent, see add_virtual_loss
+        while not self.budget.exhausted(root):
+            self.make_room(root, self.tree_workers)
+            batch = []
+            for _ in range(min(self.tree_workers, self.budget.remaining())):
+                node, descent = self.tree_policy(root)
+                self.add_virtual_loss(descent, loss)
+                batch.append((descent, (self.node_state(node).copy(), node.to_move)))
+                self.restore_board()
+
+            rewards = evaluate_batch(self, [leaf for _, leaf in batch])
+            for (descent, _), reward in zip(batch, rewards):
+                self.remove_virtual_loss(descent, loss)
+                self.backup(descent, reward)
+                loss = min(loss, -abs(reward) if self.adversarial else reward)
+            self.budget.tick(len(batch))
+
+        return root
+
+    def new_root(self, state):
+        self.book_prior = {}
+        root = None
+        if self.reuse_tree:
+            root = reuse_subtree(self.root, self.root_state, self.last_move, state, self.code, self.store_states,
+                                 self.adversarial, self.widening)
+        if root is None:
+            root = self.make_root(state)
+            if self.book is not None:
+                self.start_from_book(root, state)
+        return root
+
+    def start_from_book(self, root, state):
+        prior = self.book.get_prior(book_kind(self), state, self.code)
+        if prior:
+            warm_start(root, prior, get_legal_moves(state, self.code),
+                       lambda move: self.make_child(root, state, move))
+            self.book_prior = {child: prior[child.move] for child in root.children}
+            if self.widening is not None:
+                root.untried_moves = self.widening.order(state, self.code, root.untried_moves)
+
+    def get_book_prior(self, root):
+        # {move: (visits, total_reward)} of the root children still carrying a book
+        # prior; a child recycled and expanded again starts from zero
+        return {child.move: self.book_prior[child] for child in root.children if child in self.book_prior}
+
+    def start_search(self, state, root, start_time):
+        if self.transpositions is not None:
+            # Keys are only valid for the positions of this search's tree
+            self.transpositions.clear()
+        self.budget = SearchBudget(self.simulations, self.time_limit_ms, self.early_stop, start_time)
+        self.root_state = state.copy()
+        self.root = root
+        self.n_nodes = count_nodes(root) if self.max_nodes is not None else 0
+
+    def make_room(self, root, n_new=1):
+        # Keeps the tree within max_nodes: when the next n_new expansions would go
+        # past the cap, the least visited subtrees are recycled, at least a tenth
+        # of the cap at once so the cost of a recycling pass is spread out
+        if self.max_nodes is not None and self.n_nodes + n_new > self.max_nodes:
+            self.n_nodes -= recycle(root, self.n_nodes + n_new - self.max_nodes + self.max_nodes // 10)
+
+    def make_root(self, state):
+        return self.node_cls(state=self.board if self.store_states else None, to_move=self.code)
+
+    def make_child(self, parent, state, move):
+        to_move = state.opponent(self.code) if self.adversarial else self.code
+        return self.node_cls(state=self.simulate_move(state, move) if self.store_states else None, parent=parent,
+                             move=move, to_move=to_move)
+
+    def expand(self, node):
+        state = self.node_state(node)
+        if node.is_fully_expanded(state, node.to_move, self.widening):
+            child = random.choice(node.children)
+            self.play(child)
+            return child
+
+        move = node.untried_moves.pop()
+        to_move = state.opponent(node.to_move) if self.adversarial else self.code
+        key = None
+        shared = None
+        if self.transpositions is not None:
+            key = self.transpositions.child_key(state, move, to_move)
+            shared = self.transpositions.get(key)
+        if shared is not None:
+            # Transposition: share the stats and the stored state of the known position
+            stats, shared_state = shared
+            child = self.node_cls(state=shared_state, parent=node, move=move, to_move=to_move, stats=stats)
+        else:
+            new_state = self.simulate_move(state, move) if self.store_states else None
+            child = self.node_cls(state=new_state, parent=node, move=move, to_move=to_move)
+            if key is not None:
+                self.transpositions.put(key, child.stats, new_state)
+        node.add_child(child)
+        self.n_nodes += 1
+        self.play(child)
+        return child
+
+    def evaluate(self, state, to_move=None):
+        # Reward of a leaf for us. to_move: side to move at the leaf, None when it
+        # follows one of our moves in a single-agent tree.
+        if self.rollout is None or self.is_terminal(state):
+            return self.default_policy(state)
+        if to_move is None or not self.adversarial:
+            # Our leaf move was the last one, so the playout starts with the opponent
+            to_move = state.opponent(self.code)
+        return self.rollout.run(state, (to_move, state.opponent(to_move)), self.default_policy, self.is_terminal)
+
+    def default_policy(self, state):
+        reward = self.evaluator.progress(state, self.code)
+        if self.adversarial:
+            # Zero-sum: our progress against the opponent's
+            reward -= self.evaluator.progress(state, state.opponent(self.code))
+        return reward
+
+    def default_policy_batch(self, states):
+        # default_policy of many leaves at once, as a list
+        rewards = self.evaluator.progress_batch(states, self.code)
+        if self.adversarial:
+            rewards = rewards - self.evaluator.progress_batch(states, states[0].opponent(self.code))
+        return rewards.tolist()
+
+    def final_child(self, root):
+        # The early-stop bound is on visit counts, so it returns the most visited child
+        if self.early_stop:
+            return max(root.children, key=lambda child: child.visits)
+        return root.best_child(c_param=0)
+
+    def get_best_move(self):
+        # Anytime API: current best root move, callable while search() runs in another thread
+        root = self.root
+        if root is None or not root.children:
+            return None
+        return self.root_state.to_cors(self.final_child(root).move)
+
+    def stop(self):
+        # Ends the running search after its current simulation (not a root-parallel
+        # one, whose budgets live in the workers)
+        if self.budget is not None:
+            self.budget.stop()
+
+    def __getstate__(self):
+        # Players are pickled to pool workers: leave the search tree behind
+        state = self.__dict__.copy()
+        state['root'] = None
+        state['budget'] = None
+        state['book_prior'] = {}
+        return state
+
+    def node_state(self, node):
+        return node.state if self.store_states else self.board
+
+    def play(self, node):
+        # Follow the descent on self.board when nodes don't store their state
+        if not self.store_states:
+            self.board.apply(node.move)
+            self.played.append(node.move)
+
+    def restore_board(self):
+        while self.played:
+            self.board.undo(self.played.pop())
+
+    def simulate_move(self, state, move):
+        new_state = state.copy()
+        new_state.apply(move)
+        return new_state
+
+    def is_terminal(self, state):
+        # A descent ends once a side has won: our side only in a single-agent tree
+        if self.win_threshold is None:
+            if self.adversarial:
+                return state.all_in_goal(self.code) or state.all_in_goal(state.opponent(self.code))
+            return state.all_in_goal(self.code)
+        if self.adversarial:
+            return (state.get_n_pieces_goal(self.code) >= self.win_threshold
+                    or state.get_n_pieces_goal(state.opponent(self.code)) >= self.win_threshold)
+        return state.get_n_pieces_goal(self.code) >= self.win_threshold
@@ -0,0 +1,49 @@
+import random
+
+from movegen import get_legal_moves
+
+POLICIES = ("random", "greedy")
+
+
+class Rollout:
+    # policy: "random" plays uniform legal moves, "greedy" plays the move with the
+    # largest goal-distance gain (a random one with probability epsilon).
+    # The playout is cut off after `depth` plies and scored by the player's heuristic.
+    def __init__(self, policy="random", depth=20, n_rollouts=1, epsilon=0.1):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown rollout policy: {policy}")
+        self.policy = policy
+        self.depth = depth
+        self.n_rollouts = n_rollouts
+        self.epsilon = epsilon
+        self.plies = 0  # total plies played, for plies/sec measurements
+
+    def run(self, state, codes, evaluate, is_terminal=None):
+        # codes: sides in playing order, cycled. A playout ends when a side has all
+        # its pieces in the goal or is_terminal(state), the player's own test (its
+        # win_threshold), holds. All n_rollouts playouts run on `state` itself with
+        # apply/undo, so no board is copied and the state is left as it was.
+        total = 0
+        for _ in range(self.n_rollouts):
+            played = []
+            for ply in range(self.depth):
+                code = codes[ply % len(codes)]
+                moves = get_legal_moves(state, code)
+                if not moves:
+                    continue
+                move = self.choose(state, code, moves)
+                state.apply(move)
+                played.append(move)
+                if state.all_in_goal(code) or (is_terminal is not None and is_terminal(state)):
+                    break
+            self.plies += len(played)
+            total += evaluate(state)
+            while played:
+                state.undo(played.pop())
+        return total / self.n_rollouts
+
+    def choose(self, state, code, moves):
+        if self.policy == "random" or random.random() < self.epsilon:
+            return moves[int(random.random() * len(moves))]
+        distances = state.distances[code - 1]
+        return max(moves, key=lambda move: distances[move[0]] - distances[move[1]])
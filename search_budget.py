@@ -0,0 +1,52 @@
+import time
+
+
+class SearchBudget:
+    # Decides when a search stops: after `simulations` iterations, or at the
+    # deadline when time_limit_ms is set. With early_stop, the search also ends
+    # once the most visited root child leads the runner-up by more visits than
+    # the remaining budget could give it. start_time: perf_counter() time the
+    # deadline counts from, by default now.
+    def __init__(self, simulations, time_limit_ms=None, early_stop=False, start_time=None):
+        self.simulations = simulations
+        self.time_limit_ms = time_limit_ms
+        self.early_stop = early_stop
+        self.done = 0
+        self.start_time = start_time if start_time is not None else time.perf_counter()
+        self.stopped = False
+
+    def tick(self, n=1):
+        self.done += n
+
+    def stop(self):
+        self.stopped = True
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start_time) * 1000
+
+    def remaining(self):
+        # Simulations left, estimated from the current rate when the budget is a deadline
+        if self.time_limit_ms is None:
+            return self.simulations - self.done
+        elapsed = self.elapsed_ms()
+        if elapsed >= self.time_limit_ms:
+            return 0
+        if self.done == 0:
+            return self.simulations
+        return int(self.done / elapsed * (self.time_limit_ms - elapsed))
+
+    def exhausted(self, root):
+        if self.stopped:
+            return True
+        remaining = self.remaining()
+        if remaining <= 0:
+            return True
+        if self.early_stop and len(root.children) > 1:
+            first, second = 0, 0
+            for child in root.children:
+                if child.visits > first:
+                    first, second = child.visits, first
+                elif child.visits > second:
+                    second = child.visits
+            return first - second > remaining
+        return False
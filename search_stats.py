@@ -0,0 +1,118 @@
+import sys
+import time
+
+PHASES = ("selection", "expansion", "evaluation", "backup")
+
+# Player method timed for each phase. Expansion runs inside tree_policy, so its
+# time is taken out of selection afterwards.
+PHASE_METHODS = {"selection": "tree_policy", "expansion": "expand", "evaluation": "evaluate", "backup": "backup"}
+
+
+class SearchStats:
+    # Instrumentation of one move's search, see instrumented_search
+    def __init__(self):
+        self.phase_ms = dict.fromkeys(PHASES, 0.0)
+        self.total_ms = 0.0
+        self.simulations = 0
+        self.n_nodes = 0
+        self.max_depth = 0
+        self.branching = 0.0  # mean number of children of the expanded nodes
+        self.node_bytes = 0  # nodes, their containers and stored states, by sys.getsizeof
+
+    def sims_per_sec(self):
+        return self.simulations / self.total_ms * 1000 if self.total_ms else 0.0
+
+    def measure_tree(self, root):
+        seen_states = set()
+        n_expanded = 0
+        n_children = 0
+        stack = [(root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            self.n_nodes += 1
+            self.max_depth = max(self.max_depth, depth)
+            if node.children:
+                n_expanded += 1
+                n_children += len(node.children)
+            self.node_bytes += node_size(node, seen_states)
+            stack.extend((child, depth + 1) for child in node.children)
+        self.branching = n_children / n_expanded if n_expanded else 0.0
+
+    def as_dict(self):
+        row = {f"{phase}_ms": round(self.phase_ms[phase], 3) for phase in PHASES}
+        row.update({
+            "total_ms": round(self.total_ms, 3),
+            "simulations": self.simulations,
+            "sims_per_sec": round(self.sims_per_sec(), 1),
+            "nodes": self.n_nodes,
+            "max_depth": self.max_depth,
+            "branching": round(self.branching, 2),
+            "node_bytes": self.node_bytes,
+        })
+        return row
+
+
+STATS_FIELDS = list(SearchStats().as_dict())
+
+
+def get_fields(node):
+    # Field values of a plain or a slotted node
+    fields = getattr(node, "__dict__", None)
+    if fields is not None:
+        return list(fields.values())
+    names = [name for cls in type(node).__mro__ for name in getattr(cls, "__slots__", ())]
+    return [getattr(node, name) for name in names if hasattr(node, name)]
+
+
+def node_size(node, seen_states):
+    size = sys.getsizeof(node)
+    fields = getattr(node, "__dict__", None)
+    if fields is not None:
+        size += sys.getsizeof(fields)
+    for value in get_fields(node):
+        if isinstance(value, (list, dict, set)):
+            size += sys.getsizeof(value)
+    state = node.state
+    # Transposed nodes share one state, count it once
+    if state is not None and id(state) not in seen_states:
+        seen_states.add(id(state))
+        size += sys.getsizeof(state) + sys.getsizeof(state.cells) + sys.getsizeof(state.slots)
+        size += sum(sys.getsizeof(pieces) for pieces in state.pieces)
+    return size
+
+
+def timed(stats, phase, method):
+    def wrapper(*args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            stats.phase_ms[phase] += (time.perf_counter() - start) * 1000
+    return wrapper
+
+
+def instrumented_search(player, search, state, *args):
+    # Runs search(state, *args) with per-phase timers and returns (root, SearchStats).
+    # The timers shadow the player's methods on the instance for this search only,
+    # so an uninstrumented search runs the plain methods. Searches that send the
+    # player to a process pool (root parallelism, or tree parallelism with
+    # playouts) can't pickle the timers and only get the wall time and tree
+    # statistics.
+    stats = SearchStats()
+    methods = {}
+    pooled = player.n_workers > 1 or (player.rollout is not None and getattr(player, "tree_workers", 1) > 1)
+    if not pooled:
+        methods = {name: timed(stats, phase, getattr(player, name)) for phase, name in PHASE_METHODS.items()}
+    player.__dict__.update(methods)
+    start = time.perf_counter()
+    try:
+        root = search(state, *args)
+    finally:
+        for name in methods:
+            del player.__dict__[name]
+    stats.total_ms = (time.perf_counter() - start) * 1000
+    stats.phase_ms["selection"] -= stats.phase_ms["expansion"]
+
+    stats.simulations = player.budget.done if player.budget is not None else root.visits
+    stats.measure_tree(root)
+    return root, stats
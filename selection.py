@@ -0,0 +1,24 @@
+import math
+from itertools import repeat
+from operator import add, mul
+
+# INV_SQRT[n] = 1 / sqrt(n + 1), the per-child factor of the UCT exploration term
+INV_SQRT = [1.0]
+
+
+def grow_inv_sqrt(max_visits):
+    # Extends the table to cover visit counts up to max_visits (and as many again)
+    INV_SQRT.extend(1 / math.sqrt(n + 1) for n in range(len(INV_SQRT), 2 * max_visits + 1))
+
+
+def uct_select(children, child_q, child_visits, parent_visits, c_param):
+    # children[i] maximizing child_q[i] + c * sqrt(log(parent_visits + 1) / (child_visits[i] + 1)).
+    # The log is taken once per call and the per-child terms are combined by map,
+    # so no Python function runs per child.
+    explore = c_param * math.sqrt(math.log(parent_visits + 1))
+    # Shared (transposition) stats can give a child more visits than its parent
+    max_visits = max(parent_visits, max(child_visits))
+    if max_visits >= len(INV_SQRT):
+        grow_inv_sqrt(max_visits)
+    scores = list(map(add, child_q, map(mul, repeat(explore), map(INV_SQRT.__getitem__, child_visits))))
+    return children[scores.index(max(scores))]
@@ -0,0 +1,182 @@
+import argparse
+import itertools
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import pandas as pd
+
+from match import WIN_THRESHOLD, MAX_MOVE_COUNT, AGENT_TYPES, parse_agent
+from tournament import game_seed, run_game
+
+# Options each agent type accepts in a --grid sweep
+GRID_OPTIONS = {
+    "MCTS": ("c", "simulations"),
+    "GRAVE": ("c", "simulations"),
+    "RAVE": ("simulations",),
+    "Random": (),
+}
+
+
+def grid_specs(grid):
+    # ["type=MCTS,GRAVE", "c=0.7,1.4"] -> one agent spec per combination the type accepts
+    axes = {}
+    for axis in grid:
+        key, _, values = axis.partition("=")
+        axes[key] = values.split(",")
+    specs = []
+    for agent_type in axes.pop("type", list(AGENT_TYPES)):
+        keys = [key for key in axes if key in GRID_OPTIONS[agent_type]]
+        for values in itertools.product(*(axes[key] for key in keys)):
+            options = ",".join(f"{key}={value}" for key, value in zip(keys, values))
+            specs.append(f"{agent_type}:{options}" if options else agent_type)
+    return specs
+
+
+def wilson_interval(score, n, z=1.96):
+    if n == 0:
+        return 0, 1
+    p = score / n
+    center = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return center - half, center + half
+
+
+def sprt(wins, losses, elo1, alpha=0.05, beta=0.05):
+    # Two-sided SPRT on decisive games: H0 elo=0 against H1 elo=+elo1 and elo=-elo1.
+    # Returns "win"/"loss" when one side is shown stronger, "even" when both H1 are
+    # rejected, None to keep playing.
+    lower, upper = math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+    p1 = 1 / (1 + 10 ** (-elo1 / 400))
+    llr_win = wins * math.log(p1 / 0.5) + losses * math.log((1 - p1) / 0.5)
+    llr_loss = wins * math.log((1 - p1) / 0.5) + losses * math.log(p1 / 0.5)
+    if llr_win >= upper:
+        return "win"
+    if llr_loss >= upper:
+        return "loss"
+    if llr_win <= lower and llr_loss <= lower:
+        return "even"
+    return None
+
+
+def decide(result, args):
+    n = result["wins"] + result["losses"] + result["draws"]
+    if n < args.min_games:
+        return None
+    if args.test == "sprt":
+        return sprt(result["wins"], result["losses"], args.elo1)
+    low, high = wilson_interval(result["wins"] + 0.5 * result["draws"], n)
+    if low > 0.5:
+        return "win"
+    if high < 0.5:
+        return "loss"
+    return None
+
+
+def play_pairing(executor, spec_a, spec_b, pairing_seed, args):
+    # Plays spec_a against spec_b, alternating who moves first, until the test
+    # decides or max_games is reached. Results are counted from spec_a's side.
+    agent_a, agent_b = parse_agent(spec_a), parse_agent(spec_b)
+    result = {"a": spec_a, "b": spec_b, "wins": 0, "losses": 0, "draws": 0, "decision": None}
+    pending = set()
+    next_game = 0
+    while True:
+        while result["decision"] is None and next_game < args.max_games and len(pending) < args.workers:
+            # even games: a is player 1, odd games: b is player 1 (player 2 moves first)
+            if next_game % 2 == 0:
+                job = (agent_a, agent_b, (spec_a, spec_b))
+            else:
+                job = (agent_b, agent_a, (spec_b, spec_a))
+            seed = game_seed(pairing_seed, next_game)
+            pending.add(executor.submit(run_game, next_game, seed, job[0], job[1], args.win_threshold,
+                                        args.max_moves, False, job[2]))
+            next_game += 1
+        if not pending:
+            break
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        if result["decision"] is not None:
+            continue
+        for future in done:
+            winner = future.result()[0]["winner"]
+            if winner == spec_a:
+                result["wins"] += 1
+            elif winner == spec_b:
+                result["losses"] += 1
+            else:
+                result["draws"] += 1
+            result["decision"] = decide(result, args)
+            if result["decision"] is not None:
+                break
+    for future in pending:
+        future.cancel()
+    result["games"] = result["wins"] + result["losses"] + result["draws"]
+    return result
+
+
+def elo_ratings(specs, results, iterations=200):
+    # Bradley-Terry fit (minorization-maximization), draws count half; mean Elo 0
+    strength = {spec: 1.0 for spec in specs}
+    scores = {spec: 0.0 for spec in specs}
+    games = {}
+    for r in results:
+        scores[r["a"]] += r["wins"] + 0.5 * r["draws"]
+        scores[r["b"]] += r["losses"] + 0.5 * r["draws"]
+        games[(r["a"], r["b"])] = games.get((r["a"], r["b"]), 0) + r["games"]
+    for _ in range(iterations):
+        for spec in specs:
+            denominator = 0
+            for (a, b), n in games.items():
+                if spec in (a, b):
+                    other = b if spec == a else a
+                    denominator += n / (strength[spec] + strength[other])
+            if denominator > 0:
+                # keep a little mass so undefeated or winless agents stay finite
+                strength[spec] = max(scores[spec], 0.5) / denominator
+        mean_log = sum(math.log(s) for s in strength.values()) / len(strength)
+        strength = {spec: s / math.exp(mean_log) for spec, s in strength.items()}
+    return {spec: 400 * math.log10(s) for spec, s in strength.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Round-robin / parameter sweep with sequential early stopping.")
+    parser.add_argument("--agents", nargs="+", default=[], help="agent specs, TYPE[:key=value,...]")
+    parser.add_argument("--grid", nargs="+", default=[], help="axes like type=MCTS,GRAVE c=0.7,1.4 simulations=100,300")
+    parser.add_argument("--max-games", type=int, default=300, help="games per pairing when the test never decides")
+    parser.add_argument("--min-games", type=int, default=10)
+    parser.add_argument("--test", choices=("sprt", "wilson"), default="sprt")
+    parser.add_argument("--elo1", type=float, default=100, help="SPRT alternative hypothesis, in Elo")
+    parser.add_argument("--win-threshold", type=int, default=WIN_THRESHOLD)
+    parser.add_argument("--max-moves", type=int, default=MAX_MOVE_COUNT)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="sweep", help="prefix of the pairings and Elo CSV files")
+    args = parser.parse_args()
+
+    specs = list(dict.fromkeys(args.agents + grid_specs(args.grid)))
+    for spec in specs:
+        parse_agent(spec)
+    if len(specs) < 2:
+        parser.error("need at least two agents (--agents and/or --grid)")
+
+    results = []
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for pairing, (spec_a, spec_b) in enumerate(itertools.combinations(specs, 2)):
+            result = play_pairing(executor, spec_a, spec_b, args.seed + pairing * 1009, args)
+            results.append(result)
+            print(f"{spec_a} vs {spec_b}: +{result['wins']} -{result['losses']} ={result['draws']} "
+                  f"({result['decision'] or 'undecided'} after {result['games']} games)")
+
+    elo = elo_ratings(specs, results)
+    games = {spec: sum(r["games"] for r in results if spec in (r["a"], r["b"])) for spec in specs}
+    df = pd.DataFrame({
+        "Agent": specs,
+        "Elo": [round(elo[spec], 1) for spec in specs],
+        "Games": [games[spec] for spec in specs],
+    }).sort_values("Elo", ascending=False)
+    print(df.to_string(index=False))
+    df.to_csv(f"{args.out}_elo.csv", index=False)
+    pd.DataFrame(results).to_csv(f"{args.out}_pairings.csv", index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+import argparse
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from match import WIN_THRESHOLD, MAX_MOVE_COUNT, parse_agent, get_names, play_game
+from search_stats import STATS_FIELDS
+
+RECORD_FIELDS = ["game", "seed", "agent1", "agent2", "winner", "moves"]
+MOVE_STATS_FIELDS = ["game", "move", "player"] + STATS_FIELDS
+
+
+def with_c(agent, c):
+    # --c applies to the agents that take an exploration constant, unless the spec sets it
+    agent_type, options = agent
+    if agent_type in ("MCTS", "GRAVE"):
+        options = {"c": c, **options}
+    return agent_type, options
+
+
+def with_instrument(agent):
+    # --stats turns on search instrumentation of the search players
+    agent_type, options = agent
+    if agent_type != "Random":
+        options = {**options, "instrument": True}
+    return agent_type, options
+
+
+def game_seed(seed, game):
+    # Seed of one game, derived from the tournament seed so any game can be replayed alone
+    return (seed * 1000003 + game) % 2 ** 32
+
+
+def run_game(game, seed, agent1, agent2, win_threshold, max_moves, verbose, names=None):
+    move_stats = []
+    winner, count = play_game(agent1, agent2, win_threshold, max_moves, verbose, seed=seed, names=names,
+                              move_stats=move_stats)
+    for row in move_stats:
+        row["game"] = game
+    return {"game": game, "seed": seed, "winner": winner or "", "moves": count}, move_stats
+
+
+def read_record(path, seed, specs):
+    # Games already finished by an earlier run of the same tournament. specs: the
+    # --agent1 and --agent2 strings, which the file name only partly tells apart
+    if not os.path.exists(path):
+        return {}
+    with open(path, newline="") as f:
+        records = {int(row["game"]): row for row in csv.DictReader(f)}
+    for game, row in records.items():
+        if int(row["seed"]) != game_seed(seed, game):
+            raise SystemExit(f"{path} was played with another --seed; remove it or pass the same seed")
+        if (row.get("agent1"), row.get("agent2")) != specs:
+            raise SystemExit(f"{path} was played with other agents; remove it or pass the same --agent1/--agent2")
+    return records
+
+
+def iter_results(games, args, agent1, agent2):
+    # Yields each game's result as soon as it finishes
+    jobs = [(game, game_seed(args.seed, game), agent1, agent2, args.win_threshold, args.max_moves, args.verbose)
+            for game in games]
+    if args.workers <= 1:
+        for job in jobs:
+            yield run_game(*job)
+        return
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(run_game, *job) for job in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play AI-vs-AI games without the pygame display.")
+    parser.add_argument("--agent1", default="GRAVE:simulations=300", help="TYPE[:key=value,...], TYPE in MCTS/RAVE/GRAVE/Random")
+    parser.add_argument("--agent2", default="MCTS:simulations=300", help="same format as --agent1, moves first")
+    parser.add_argument("--games", type=int, default=300)
+    parser.add_argument("--c", type=float, default=1.4)
+    parser.add_argument("--win-threshold", type=int, default=WIN_THRESHOLD)
+    parser.add_argument("--max-moves", type=int, default=MAX_MOVE_COUNT)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="games played in parallel")
+    parser.add_argument("--seed", type=int, default=0, help="tournament seed, each game gets a seed derived from it")
+    parser.add_argument("--verbose", action="store_true", help="show the players' move output")
+    parser.add_argument("--stats", action="store_true", help="write per-move search statistics of both agents")
+    args = parser.parse_args()
+
+    agent1 = with_c(parse_agent(args.agent1), args.c)
+    agent2 = with_c(parse_agent(args.agent2), args.c)
+    name1, name2 = get_names(agent1, agent2)
+    if args.stats:
+        agent1, agent2 = with_instrument(agent1), with_instrument(agent2)
+
+    # Per-game record, appended as games finish; rerunning resumes from it
+    record_path = f"games_{name1}_{name2}_{args.c}.csv"
+    records = read_record(record_path, args.seed, (args.agent1, args.agent2))
+    todo = [game for game in range(args.games) if game not in records]
+    if records:
+        print(f"Resuming: {len(records)} games already in {record_path}, {len(todo)} to play")
+
+    # Per-move search statistics with --stats, appended with each finished game
+    stats_path = f"stats_{name1}_{name2}_{args.c}.csv"
+    stats_file = None
+    if args.stats:
+        write_stats_header = not os.path.exists(stats_path)
+        stats_file = open(stats_path, "a", newline="")
+        stats_writer = csv.DictWriter(stats_file, fieldnames=MOVE_STATS_FIELDS)
+        if write_stats_header:
+            stats_writer.writeheader()
+
+    write_header = not os.path.exists(record_path)
+    with open(record_path, "a", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=RECORD_FIELDS)
+        if write_header:
+            writer.writeheader()
+        for result, move_stats in iter_results(todo, args, agent1, agent2):
+            if stats_file is not None:
+                stats_writer.writerows(move_stats)
+                stats_file.flush()
+            writer.writerow({**result, "agent1": args.agent1, "agent2": args.agent2})
+            f.flush()
+            records[result["game"]] = result
+            print(f"game {result['game'] + 1}/{args.games}: {result['winner'] or 'draw'} in {result['moves']} moves "
+                  f"({len(records)} done)")
+
+    if stats_file is not None:
+        stats_file.close()
+
+    win_counts = {name1: 0, name2: 0}
+    n = args.games
+    for game in range(n):
+        winner = records[game]["winner"]
+        if winner:
+            win_counts[winner] += 1
+
+    win_rates = {
+        name1: win_counts[name1] / n,
+        name2: win_counts[name2] / n
+    }
+    print(win_rates)
+
+    df = pd.DataFrame({
+        "Agent": [name1, name2],
+        "Win Rate": [win_rates[name1], win_rates[name2]],
+        "Win Count": [win_counts[name1], win_counts[name2]]
+    })
+    df.to_csv(f"win_rates_{name1}_{name2}_{args.c}.csv", index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+from collections import OrderedDict
+
+EVICTION_POLICIES = ("lru", "visits")
+
+
+class SharedStatsNode:
+    # Mixin for a node class whose visits/total_reward live in a [visits,
+    # total_reward] list shared by every node of the same position, e.g.
+    # class SharedMCTSNode(SharedStatsNode, MCTSNode) with __slots__ = ('stats',)
+    __slots__ = ()
+
+    def __init__(self, state, parent=None, move=None, to_move=None, stats=None):
+        self.stats = [0, 0]
+        super().__init__(state, parent, move, to_move)
+        if stats is not None:
+            self.stats = stats
+
+    def best_child(self, c_param=1.4):
+        # A child's stats also change through the other nodes sharing them
+        for child in self.children:
+            self.update_child(child)
+        return super().best_child(c_param)
+
+    @property
+    def visits(self):
+        return self.stats[0]
+
+    @visits.setter
+    def visits(self, value):
+        self.stats[0] = value
+
+    @property
+    def total_reward(self):
+        return self.stats[1]
+
+    @total_reward.setter
+    def total_reward(self, value):
+        self.stats[1] = value
+
+
+class TranspositionTable:
+    # position key -> (stats, state) of the first node created for that position:
+    # its [visits, total_reward] list and stored state. Later nodes for the same
+    # position reuse both, so transpositions share visits and rewards. The node
+    # itself isn't kept, so a subtree recycled from the tree isn't kept alive by
+    # the table. At most max_size positions are kept; "lru" evicts the least
+    # recently used one, "visits" evicts the least visited tenth in one pass.
+    def __init__(self, max_size=100000, eviction="lru"):
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {eviction}")
+        self.max_size = max_size
+        self.eviction = eviction
+        self.entries = OrderedDict()
+        self.lookups = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def __getstate__(self):
+        # Sent to pool workers with the player: an empty table with the same settings
+        state = self.__dict__.copy()
+        state['entries'] = OrderedDict()
+        return state
+
+    def child_key(self, state, move, code):
+        # Key of the position after `move` on `state`, with `code` to move there
+        return state.hash_after(move) ^ state.table.side_keys[code]
+
+    def get(self, key):
+        # (stats, state) of the position, None when it isn't in the table
+        self.lookups += 1
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            if self.eviction == "lru":
+                self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, stats, state):
+        self.entries[key] = (stats, state)
+        if len(self.entries) > self.max_size:
+            self.evict()
+
+    def evict(self):
+        if self.eviction == "lru":
+            self.entries.popitem(last=False)
+            self.evictions += 1
+            return
+        n_evict = max(1, len(self.entries) // 10)
+        for key in sorted(self.entries, key=lambda k: self.entries[k][0][0])[:n_evict]:
+            del self.entries[key]
+        self.evictions += n_evict
+
+    def clear(self):
+        self.entries.clear()
+
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0
+
+    def get_stats(self):
+        return {
+            "size": len(self.entries),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": self.hit_rate(),
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,72 @@
+import random
+
+from board_state import EMPTY
+from movegen import get_legal_moves
+
+
+def find_reply(before, after, opponent):
+    # The single opponent move that turns cells `before` into `after`, or None
+    diff = [i for i in range(len(before)) if before[i] != after[i]]
+    if len(diff) != 2:
+        return None
+    a, b = diff
+    if before[a] == opponent and after[a] == EMPTY and before[b] == EMPTY and after[b] == opponent:
+        return a, b
+    if before[b] == opponent and after[b] == EMPTY and before[a] == EMPTY and after[a] == opponent:
+        return b, a
+    return None
+
+
+def reuse_subtree(root, root_state, last_move, state, code, store_states=True, adversarial=False, widening=None):
+    # Promote the child reached by our last move to the new root when `state` is
+    # that child's position plus one opponent reply. The subtree is replayed on
+    # the new position: children whose move the reply made illegal are dropped and
+    # the untried move stacks are regenerated, ordered by `widening` when given.
+    # An adversarial tree holds the replies, so the node after the reply is
+    # promoted as is. Returns None when nothing matches.
+    if root is None or last_move is None:
+        return None
+    child = next((node for node in root.children if node.move == last_move), None)
+    if child is None:
+        return None
+
+    position = root_state.copy()
+    position.apply(last_move)
+    reply = None
+    if position.cells != state.cells:
+        reply = find_reply(position.cells, state.cells, state.opponent(code))
+        if reply is None:
+            return None
+    if adversarial:
+        child = next((node for node in child.children if node.move == reply), None)
+        if child is None:
+            return None
+        child.parent = None
+        child.move = None
+        return child
+
+    child.parent = None
+    child.move = None
+    stack = [(child, state.copy())]
+    while stack:
+        node, node_state = stack.pop()
+        node.state = node_state if store_states else None
+        if not node.children:
+            # Nothing to check: the moves are generated on the next visit
+            node.untried_moves = None
+            continue
+        moves = get_legal_moves(node_state, code)
+        legal = set(moves)
+        node.set_children([c for c in node.children if c.move in legal])
+        tried = {c.move for c in node.children}
+        untried = [move for move in moves if move not in tried]
+        if widening is None:
+            random.shuffle(untried)
+        else:
+            untried = widening.order(node_state, code, untried)
+        node.untried_moves = untried
+        for c in node.children:
+            child_state = node_state.copy()
+            child_state.apply(c.move)
+            stack.append((c, child_state))
+    return child
@@ -0,0 +1,33 @@
+import random
+
+
+class Widening:
+    # Progressive widening: a node with n visits may have at most
+    # max(1, int(k * (n + 1) ** alpha)) children, so a wide node is searched
+    # below its first children before every legal move has been tried once.
+    # Untried moves are expanded best first by a cheap prior, the goal distance
+    # the move gains. prune_backward drops the moves that take the piece further
+    # from the goal, unless every move does. k=None: no cap, only the ordering
+    # and pruning.
+    def __init__(self, k=None, alpha=0.5, prune_backward=False):
+        if k is not None and k < 1:
+            raise ValueError(f"Widening factor must be at least 1, got {k}")
+        self.k = k
+        self.alpha = alpha
+        self.prune_backward = prune_backward
+
+    def allows(self, node):
+        # Whether the node may get one more child
+        return self.k is None or len(node.children) < max(1, int(self.k * (node.visits + 1) ** self.alpha))
+
+    def order(self, state, code, moves):
+        # Untried-move stack of side `code`: popped from the end, so the largest
+        # gain comes first; equal gains stay in random order
+        distances = state.distances[code - 1]
+        random.shuffle(moves)
+        if self.prune_backward:
+            forward = [move for move in moves if distances[move[1]] <= distances[move[0]]]
+            if forward:
+                moves = forward
+        moves.sort(key=lambda move: distances[move[0]] - distances[move[1]])
+        return moves